@@ -0,0 +1,87 @@
+"""
+Controlul admiterii pentru endpoint-urile studentilor (/api/verify-attendance, /register).
+Limitare pe device si pe IP (token bucket, stare comuna in SharedTTLCache) si un plafon global
+de cereri in lucru, comun pentru toti workerii. Ambele resping inainte de orice acces la baza de date.
+"""
+
+import math
+import os
+import random
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows, acolo avem oricum un singur proces
+    fcntl = None
+
+
+class RateLimiter:
+    # Token bucket scris ca GCRA: pentru fiecare cheie se tine un singur numar, momentul (epoch)
+    # la care galeata ar fi din nou plina, deci incape intr-un slot din SharedTTLCache
+    # rate = cereri pe secunda pe termen lung, burst = cate pot veni deodata
+
+    def __init__(self, cache, rate, burst):
+        self.cache = cache
+        self.interval = 1.0 / rate
+        self.tolerance = self.interval * (burst - 1)
+
+    def _take(self, full_at, now):
+        full_at = max(full_at or now, now)
+        if full_at - self.tolerance > now:
+            # Galeata goala: nu se scrie nimic, se intoarce peste cat timp intra un token
+            return None, None, full_at - self.tolerance - now
+        full_at += self.interval
+        return full_at, full_at, 0.0
+
+    def check(self, key, now=None):
+        # 0 daca cererea trece (si consuma un token), altfel cate secunde sa astepte clientul
+        return self.cache.update(key, self._take, now)
+
+
+class ConcurrencyLimiter:
+    # Semafor comun pentru toti workerii: `limit` octeti dintr-un fisier, fiecare cerere in lucru tine
+    # un lockf pe unul din ei. Kernelul elibereaza lock-urile unui worker mort, deci nu ramane nimic blocat
+    # lockf e per proces, asa ca threadurile aceluiasi worker isi impart octetii printr-un set local
+    # path=None (baza ':memory:', un singur proces): doar setul local
+
+    def __init__(self, path, limit):
+        self.path = path
+        self.limit = limit
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600) if fcntl is not None and path is not None else None
+        self._held = set()
+        self._lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork_in_child)
+
+    def _after_fork_in_child(self):
+        # Lock-urile parintelui nu trec prin fork
+        self._held = set()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        # Numarul slotului luat, sau None daca sunt deja `limit` cereri in lucru
+        with self._lock:
+            start = random.randrange(self.limit)
+            for i in range(self.limit):
+                slot = (start + i) % self.limit
+                if slot in self._held:
+                    continue
+                if self._fd is not None:
+                    try:
+                        fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, slot)
+                    except OSError:
+                        continue
+                self._held.add(slot)
+                return slot
+        return None
+
+    def release(self, slot):
+        with self._lock:
+            if self._fd is not None:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, slot)
+            self._held.discard(slot)
+
+
+def retry_after_header(seconds):
+    # Retry-After e in secunde intregi, minim 1
+    return str(max(1, math.ceil(seconds)))
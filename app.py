@@ -2,27 +2,44 @@
 Prezenta - Main Flask app
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, Response, make_response
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, Response, make_response, stream_with_context, g, send_from_directory
 import hashlib
+import hmac
 import csv
 import secrets
 import time
 import os
 import json
-from datetime import datetime
-import qrcode
+from datetime import datetime, timedelta
 import io
 import base64
 from math import radians, cos, sin, asin, sqrt
 
 import config
+from exporters import text_report, csv_report, xlsx_report
+from reports import build_attendance_matrix
+from qr_render import qr_matrix, qr_svg, qr_png_base64
+from maintenance import MaintenanceScheduler, default_lock_path
+from admission import RateLimiter, ConcurrencyLimiter, retry_after_header
+from shared_cache import SharedTTLCache
+from idempotency import ResponseCache
 from database import (
-    db_read_students, db_write_student, db_delete_student,
-    db_read_devices, db_write_device, db_delete_device, db_find_student_by_token,
-    db_read_attendance, db_write_attendance, db_check_attendance_exists, db_delete_attendance,
-    db_read_teachers, db_write_teacher, db_update_teacher_password,
-    db_read_device_cooldowns, db_write_device_cooldown, db_cleanup_device_cooldowns,
-    db_read_qr_tokens, db_write_qr_token, db_cleanup_qr_tokens
+    init_database,
+    db_read_students, db_read_student, db_write_student, db_write_students, db_delete_student,
+    db_find_student_by_barcode, db_student_exists, db_bulk_insert_students, db_register_student,
+    db_read_devices, db_write_device, db_write_devices, db_delete_device, db_find_student_by_token, db_find_student_by_device,
+    db_read_attendance, db_write_attendance, db_submit_attendance_with_cooldown,
+    db_check_attendance_exists, db_delete_attendance,
+    db_start_lesson, db_list_lessons, db_lessons_between, db_list_groups, db_read_group_roster, db_query_attendance,
+    db_count_attendance_by_group, db_iter_attendance_export,
+    db_read_recent_attendance, db_read_stats_counters,
+    db_read_teachers, db_read_teacher, db_write_teacher, db_write_teachers, db_update_teacher_password,
+    db_any_default_password,
+    db_read_device_cooldown, db_write_device_cooldown, db_write_device_cooldowns,
+    db_cleanup_device_cooldowns,
+    db_read_qr_tokens, db_read_qr_token, db_write_qr_token, db_write_qr_tokens, db_cleanup_qr_tokens,
+    db_issue_qr_token, db_resolve_display_code, db_cleanup_display_codes,
+    db_sidecar_path
 )
 
 app = Flask(__name__)
@@ -31,6 +48,30 @@ app.debug = True  #
 FLASK_DEBUG=1
 # vedem daca exista folderul
 os.makedirs(config.DATA_DIR, exist_ok=True)
+# Schema se creeaza explicit, o singura data; database.py nu mai face nimic la import
+# (testele si benchmark-urile pot apela inainte database.configure_database(':memory:'))
+init_database()
+
+# Fisierele statice cu hash in nume (python3 build_static.py); fara build se servesc direct din static/
+STATIC_DIST_DIR = os.path.join(app.static_folder, 'dist')
+try:
+    with open(os.path.join(STATIC_DIST_DIR, 'assets.json')) as f:
+        ASSET_MANIFEST = json.load(f)
+except (OSError, ValueError):
+    ASSET_MANIFEST = {}
+
+@app.template_global()
+def asset_url(filename):
+    # Adresa fisierului static, varianta cu hash daca exista
+    hashed = ASSET_MANIFEST.get(filename)
+    return url_for('static', filename=f'dist/{hashed}' if hashed else filename)
+
+@app.after_request
+def static_cache_headers(response):
+    # Fisierele cu hash nu se schimba niciodata (un continut nou primeste alt nume); in productie le da nginx
+    if request.path.startswith('/static/dist/') and response.status_code == 200:
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
 
 # Fucntiile maine pentru tot
 
@@ -89,6 +130,43 @@ def generate_qr_token():
     # Generarea unui token QR unic
     return secrets.token_urlsafe(32)
 
+def _b64url(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+def _b64url_decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def _qr_signature(payload):
+    # HMAC-SHA256 cu SECRET_KEY, trunchiat la 16 bytes ca sa nu creasca prea mult codul QR
+    return hmac.new(config.SECRET_KEY.encode(), payload.encode(), hashlib.sha256).digest()[:16]
+
+def sign_qr_token(lesson_id, classroom, created_at):
+    # Token QR care se valideaza singur: payload.semnatura
+    # Are mereu un '.', spre deosebire de token_urlsafe, asa se deosebesc cele doua formate
+    payload = _b64url(json.dumps([lesson_id, classroom, round(created_at, 3)], separators=(',', ':')).encode())
+    return f'{payload}.{_b64url(_qr_signature(payload))}'
+
+def read_signed_qr_token(token):
+    # Se verifica semnatura si se scot datele, doar CPU, fara baza de date
+    payload, _, signature = token.partition('.')
+    try:
+        if not hmac.compare_digest(_b64url_decode(signature), _qr_signature(payload)):
+            return None
+        lesson_id, classroom, created_at = json.loads(_b64url_decode(payload))
+    except (ValueError, TypeError):
+        return None
+    return {
+        'lesson_id': lesson_id,
+        'classroom': classroom,
+        'created_at': float(created_at)
+    }
+
+def resolve_qr_token(token):
+    # Tokenurile semnate se verifica in CPU, cele random se cauta in tabela qr_tokens
+    if '.' in token:
+        return read_signed_qr_token(token)
+    return db_read_qr_token(token)
+
 
 # Fucntiile pentru baza de date,               ia ibu sa stricat tot
 
@@ -97,16 +175,12 @@ def read_students():
     return db_read_students()
 
 def write_students(students):
-    # Scrie toti studentii, cu toate infromatiile deja tot gata
-    for student_id, student in students.items():
-        db_write_student(
-            student_id,
-            student['name'],
-            student['surname'],
-            student['group'],
-            student.get('barcode', ''),
-            student.get('timestamp', '')
-        )
+    # Scrie toti studentii, cu toate infromatiile deja tot gata, intr-o singura tranzactie
+    db_write_students(
+        (student_id, student['name'], student['surname'], student['group'],
+         student.get('barcode', ''), student.get('timestamp', ''))
+        for student_id, student in students.items()
+    )
 
 def add_student(name, surname, group, barcode=''):
     # Adauga un student nou
@@ -116,41 +190,96 @@ def add_student(name, surname, group, barcode=''):
     db_write_student(student_id, name, surname, group, barcode_hash, timestamp)
     return student_id
 
+def normalize_group(group):
+    # Grupa se scrie mereu la fel, cu majuscule (ca in generate_student_id), altfel 'ia1' si 'IA1'
+    # ar fi doua grupe diferite in liste, filtre si matrice; str() pentru valori numerice din JSON
+    return '' if group is None else str(group).strip().upper()
+
+def validate_student_fields(name, surname, group, barcode=''):
+    # Validarea comuna pentru adaugarea unui student (manual sau import), None daca e totul bine
+    if not all([name, surname, group]):
+        return 'Numele, prenumele si grupa trebuie completate'
+
+    # Validate no pipe characters (used as delimiter in storage)
+    if any('|' in field for field in [name, surname, group]):
+        return 'Name, surname, and group nu pot contine |'
+
+    # Validate barcode only if provided
+    if barcode and (len(barcode) != 8 or not barcode.isdigit()):
+        return 'Barcode trebuie sa aiba 8 cifre'
+
+    return None
+
+def import_students(rows):
+    # Import in bloc din randuri {'name', 'surname', 'group', 'barcode'}
+    # Returneaza raportul per rand: {'row', 'status' (added/exists/error), 'error'?, 'student_id'?}
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    report = []
+    to_insert = {}
+    for number, row in enumerate(rows, 1):
+        if not isinstance(row, dict):
+            report.append({'row': number, 'status': 'error', 'error': 'Randul trebuie sa fie un obiect cu name, surname, group'})
+            continue
+        # Valorile din JSON pot fi si numere (de ex. "group": 1011, "barcode": 12345678)
+        name, surname, barcode = (str(row.get(key) or '').strip() for key in ('name', 'surname', 'barcode'))
+        group = normalize_group(row.get('group'))
+        error = validate_student_fields(name, surname, group, barcode)
+        if error:
+            report.append({'row': number, 'status': 'error', 'error': error})
+            continue
+        student_id = generate_student_id(name, surname, group)
+        if student_id in to_insert:
+            report.append({'row': number, 'status': 'error', 'error': 'Student duplicat in fisier', 'student_id': student_id})
+            continue
+        barcode_hash = hash_barcode(barcode) if barcode else ''
+        to_insert[student_id] = (student_id, name, surname, group, barcode_hash, timestamp)
+        report.append({'row': number, 'status': 'added', 'student_id': student_id})
+
+    existing = db_bulk_insert_students(list(to_insert.values())) if to_insert else set()
+    for entry in report:
+        if entry['status'] == 'added' and entry['student_id'] in existing:
+            entry['status'] = 'exists'
+            entry['error'] = 'Studentul exista deja'
+    return report
+
 def read_devices():
     # Citeste toate device-urile din baza de date
     return db_read_devices()
 
 def write_devices(devices):
-    # Scrie toate device-urile, tot gata, in bloc
+    # Scrie toate device-urile, tot gata, in bloc (o singura tranzactie)
+    rows = []
     for student_id, data in devices.items():
         if isinstance(data, dict):
-            db_write_device(student_id, data.get('token_hash', ''), data.get('registered_at', ''))
+            rows.append((student_id, data.get('token_hash', ''), data.get('registered_at', ''),
+                         data.get('user_agent'), data.get('device_type')))
         else:
-            db_write_device(student_id, data, '')
+            rows.append((student_id, data, '', None, None))
+    db_write_devices(rows)
 
-def read_device_cooldowns():
-    # Se citeste cooldwown-urile de device
-    return db_read_device_cooldowns()
+def cooldown_remaining(token_hash):
+    # Cate secunde mai are device-ul de asteptat (0 daca nu e in cooldown), un lookup in cache
+    last_action = db_read_device_cooldown(token_hash)
+    if last_action is None:
+        return 0
+    return max(0, config.DEVICE_REREGISTER_COOLDOWN_SECONDS - (time.time() - last_action))
 
 def write_device_cooldowns(cooldowns):
-    # Scrie cooldown-urile de device, dupa ce se scaneasza
-    for token_hash, timestamp in cooldowns.items():
-        db_write_device_cooldown(token_hash, timestamp)
+    # Scrie cooldown-urile de device, dupa ce se scaneasza, intr-o singura tranzactie
+    # Pentru un singur device foloseste db_write_device_cooldown, nu rescrie toata harta
+    db_write_device_cooldowns(cooldowns.items())
 
 def read_teachers():
     # Citeste toti profesorii din baza de date
     return db_read_teachers()
 
 def write_teachers(teachers):
-    # Scrie toti profesorii, daca or mai fi cineva
-    for username, teacher in teachers.items():
-        db_write_teacher(
-            username,
-            teacher['password_hash'],
-            teacher['display_name'],
-            teacher.get('role', 'teacher'),
-            teacher.get('password_changed', False)
-        )
+    # Scrie toti profesorii, daca or mai fi cineva, intr-o singura tranzactie
+    db_write_teachers(
+        (username, teacher['password_hash'], teacher['display_name'],
+         teacher.get('role', 'teacher'), teacher.get('password_changed', False))
+        for username, teacher in teachers.items()
+    )
 
 def update_teacher_password(username, new_password):
     # Schimba parola profesorului
@@ -174,9 +303,11 @@ def read_qr_tokens():
     return db_read_qr_tokens()
 
 def write_qr_tokens(tokens):
-    # Scrie tokenurile QR
-    for token, data in tokens.items():
-        db_write_qr_token(token, data['lesson_id'], data['classroom'], data['created_at'])
+    # Scrie tokenurile QR, intr-o singura tranzactie
+    db_write_qr_tokens(
+        (token, data['lesson_id'], data['classroom'], data['created_at'])
+        for token, data in tokens.items()
+    )
 
 def add_qr_token(token, lesson_id, classroom):
     # Adauga un token QR nou
@@ -201,11 +332,94 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     r = 6371000  # Raza Pamantului la putere!!!
     return c * r
 
+def assign_display_code(qr_token, expires_at, token_row=None, attempts=20):
+    # Cod scurt de afisat (5 cifre random), unic printre tokenurile active din toti workerii
+    # Daca e dat token_row, tokenul se salveaza in aceeasi tranzactie (un singur commit per rotire)
+    candidates = (str(10000 + secrets.randbelow(90000)) for _ in range(attempts))
+    return db_issue_qr_token(qr_token, expires_at, candidates, token_row)
+
+def client_ip():
+    # IP-ul clientului: primul din X-Forwarded-For (pus de nginx), altfel adresa conexiunii
+    ip = request.headers.get('X-Forwarded-For', request.remote_addr) or ''
+    return ip.split(',')[0].strip()
+
+# Controlul admiterii pe endpoint-urile studentilor: limite pe device si pe IP, plafon de cereri in lucru
+# Starea e comuna pentru toti workerii (fisiere langa baza de date, deci a fiecarui deployment in parte),
+# respingerea nu atinge baza de date
+ADMISSION_ENDPOINTS = {'verify_attendance', 'register'}
+_rate_cache = SharedTTLCache(db_sidecar_path('ratelimit'), config.RATE_LIMIT_CACHE_SLOTS)
+device_limiter = RateLimiter(_rate_cache, config.RATE_LIMIT_DEVICE_PER_SECOND, config.RATE_LIMIT_DEVICE_BURST)
+ip_limiter = RateLimiter(_rate_cache, config.RATE_LIMIT_IP_PER_SECOND, config.RATE_LIMIT_IP_BURST)
+in_flight = ConcurrencyLimiter(db_sidecar_path('admission.lock'), config.MAX_IN_FLIGHT_REQUESTS)
 
-# Format QR: {token: {'lesson_id': str, 'classroom': str, 'created_at': float}}
-active_qr_tokens = {}
-# mapeaza QRCODE cu  codul cela de la QRcode prezenta
-display_code_to_token = {}
+@app.before_request
+def admit_request():
+    if request.method != 'POST' or request.endpoint not in ADMISSION_ENDPOINTS:
+        return None
+    # Mai intai limitele (un lookup fiecare), apoi un loc intre cererile in lucru
+    data = request.get_json(silent=True) or {}
+    device_token = str(data.get('device_token', '')).strip()
+    wait = ip_limiter.check('ip:' + client_ip())
+    if not wait and device_token:
+        wait = device_limiter.check('device:' + hash_token(device_token))
+    if wait:
+        response = jsonify({'success': False, 'error': 'Prea multe incercari. Mai asteapta putin si incearca din nou.'})
+        response.status_code = 429
+        response.headers['Retry-After'] = retry_after_header(wait)
+        return response
+    slot = in_flight.acquire()
+    if slot is None:
+        response = jsonify({'success': False, 'error': 'Serverul e ocupat acum. Incearca din nou peste o secunda.'})
+        response.status_code = 503
+        response.headers['Retry-After'] = retry_after_header(1)
+        return response
+    g.admission_slot = slot
+    return None
+
+@app.teardown_request
+def release_admission(exc):
+    slot = g.pop('admission_slot', None)
+    if slot is not None:
+        in_flight.release(slot)
+
+# Raspunsurile cererilor cu Idempotency-Key, comune pentru toti workerii (fisier langa baza de date,
+# ca un server pe alta baza sa nu dea inapoi raspunsurile altuia)
+response_cache = ResponseCache(
+    db_sidecar_path('responses'), config.IDEMPOTENCY_CACHE_SLOTS, config.IDEMPOTENCY_MAX_BODY,
+    config.IDEMPOTENCY_TTL_SECONDS, config.IDEMPOTENCY_PENDING_SECONDS
+)
+
+def idempotent(f):
+    # O cerere repetata cu acelasi Idempotency-Key primeste raspunsul original, fara verificari si fara baza de date
+    # Cheia din cache include si tokenul device-ului, ca o cheie ghicita sa nu dea raspunsul altcuiva
+    from functools import wraps
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key', '').strip()
+        if not key or len(key) > 128:
+            return f(*args, **kwargs)
+        data = request.get_json(silent=True) or {}
+        cache_key = f'{request.endpoint}:' + hash_token(f"{data.get('device_token', '')}|{key}")
+        state, cached = response_cache.begin(cache_key)
+        if state == 'pending':
+            # Originalul e inca in lucru (retry trimis prea repede): se asteapta raspunsul lui
+            cached = response_cache.wait(cache_key, config.IDEMPOTENCY_WAIT_SECONDS)
+            if cached is None:
+                return f(*args, **kwargs)
+        if cached is not None:
+            status, body = cached
+            response = make_response(body, status)
+            response.headers['Content-Type'] = 'application/json'
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            response_cache.abandon(cache_key)
+            raise
+        response_cache.finish(cache_key, response.status_code, response.get_data())
+        return response
+    return decorated_function
 
 # Rutele Principale pe website
 
@@ -221,7 +435,7 @@ def register():
         data = request.json
         name = data.get('name', '').strip()
         surname = data.get('surname', '').strip()
-        group = data.get('group', '').strip()
+        group = normalize_group(data.get('group'))
         barcode = data.get('barcode', '').strip()  # Optional now
         device_token = data.get('device_token', '').strip()
         
@@ -239,39 +453,29 @@ def register():
         
         # Se verifica cooldown-ul pe dispozitiv (sa nu se poata inregistra alt student rapid)
         device_token_hash = hash_token(device_token)
-        cooldowns = read_device_cooldowns()
-        
-        if device_token_hash in cooldowns:
-            try:
-                last_action = datetime.strptime(cooldowns[device_token_hash], '%Y-%m-%d %H:%M:%S')
-                time_since_last = (datetime.now() - last_action).total_seconds()
-                cooldown_remaining = config.DEVICE_REREGISTER_COOLDOWN_SECONDS - time_since_last
-                
-                if cooldown_remaining > 0:
-                    minutes_remaining = int(cooldown_remaining // 60)
-                    seconds_remaining = int(cooldown_remaining % 60)
-                    return jsonify({
-                        'success': False, 
-                        'error': f'Posibil ca o faci pe Desteptul. Acest dispozitiv trebuie sa astepte {minutes_remaining} minute si {seconds_remaining} secunde inainte de a inregistra alt student.'
-                    }), 400
-            except ValueError:
-                pass  # error handling, ignora si ii da mai departe
-        
-        # CSe vericica sa nu fie deja student existent
-        students = read_students()
-        student_id = generate_student_id(name, surname, group)
-        if student_id in students:
-            return jsonify({'success': False, 'error': 'Acest student este deja inregistrat'}), 400
-        
-        # Se adauga studentul
-        student_id = add_student(name, surname, group, barcode)
+        remaining = cooldown_remaining(device_token_hash)
+        if remaining > 0:
+            minutes_remaining = int(remaining // 60)
+            seconds_remaining = int(remaining % 60)
+            return jsonify({
+                'success': False, 
+                'error': f'Posibil ca o faci pe Desteptul. Acest dispozitiv trebuie sa astepte {minutes_remaining} minute si {seconds_remaining} secunde inainte de a inregistra alt student.'
+            }), 400
         
         # Se reia informatiile despre device
         user_agent = request.headers.get('User-Agent', '')
         device_type = detect_device_type(user_agent)
         
-        # Se inregistreaza tokenul dispozitivului cu informatiile despre device
-        db_write_device(student_id, hash_token(device_token), datetime.now().strftime('%Y-%m-%d %H:%M:%S'), user_agent, device_type)
+        # Studentul si tokenul dispozitivului intr-o singura tranzactie; daca studentul exista deja
+        # (cheia e hash-ul numelui si grupei), insert-ul nu face nimic si raspundem cu eroare
+        student_id = generate_student_id(name, surname, group)
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        barcode_hash = hash_barcode(barcode) if barcode else ''
+        if not db_register_student(
+            (student_id, name, surname, group, barcode_hash, timestamp),
+            (device_token_hash, timestamp, user_agent, device_type)
+        ):
+            return jsonify({'success': False, 'error': 'Acest student este deja inregistrat'}), 400
         
         return jsonify({'success': True, 'message': 'Te-ai inregistrat cu succes', 'student_id': student_id})
     
@@ -284,7 +488,7 @@ def reregister_device():
         data = request.json
         name = data.get('name', '').strip()
         surname = data.get('surname', '').strip()
-        group = data.get('group', '').strip()
+        group = normalize_group(data.get('group'))
         confirmation_code = data.get('confirmation_code', '').strip()
         existing_device_token = data.get('existing_device_token', '').strip()
         
@@ -293,13 +497,12 @@ def reregister_device():
             return jsonify({'success': False, 'error': 'Toate trebuie sa fie completate'}), 400
         
         # verificare student existent
-        students = read_students()
         student_id = generate_student_id(name, surname, group)
-        if student_id not in students:
+        student = db_read_student(student_id)
+        if student is None:
             return jsonify({'success': False, 'error': 'Student nu exista'}), 400
         
         # Se verifica codul de confirmare (Grupa + Prima litera a Numelui)
-        student = students[student_id]
         expected_code = student['group'] + student['name'][0].upper()
         
         if confirmation_code.upper() != expected_code.upper():
@@ -308,24 +511,14 @@ def reregister_device():
         # Se verifica cooldown-ul pe dispozitivul existent
         # Asta ii opreste pe toti desteptii sa schimbe device-ul rapid ca sa isi marcheze prezenta
         if existing_device_token:
-            existing_token_hash = hash_token(existing_device_token)
-            cooldowns = read_device_cooldowns()
-            
-            if existing_token_hash in cooldowns:
-                try:
-                    last_action = datetime.strptime(cooldowns[existing_token_hash], '%Y-%m-%d %H:%M:%S')
-                    time_since_last = (datetime.now() - last_action).total_seconds()
-                    cooldown_remaining = config.DEVICE_REREGISTER_COOLDOWN_SECONDS - time_since_last
-                    
-                    if cooldown_remaining > 0:
-                        minutes_remaining = int(cooldown_remaining // 60)
-                        seconds_remaining = int(cooldown_remaining % 60)
-                        return jsonify({
-                            'success': False, 
-                            'error': f'Posibil ca o faci pe Desteptul. Acest dispozitiv trebuie sa astepte {minutes_remaining} minute si {seconds_remaining} secunde inainte de a face alta schimbare.'
-                        }), 400
-                except ValueError:
-                    pass  # error handling, ignore and proceed
+            remaining = cooldown_remaining(hash_token(existing_device_token))
+            if remaining > 0:
+                minutes_remaining = int(remaining // 60)
+                seconds_remaining = int(remaining % 60)
+                return jsonify({
+                    'success': False, 
+                    'error': f'Posibil ca o faci pe Desteptul. Acest dispozitiv trebuie sa astepte {minutes_remaining} minute si {seconds_remaining} secunde inainte de a face alta schimbare.'
+                }), 400
         
         # Se genereaza un nou token de device pe server
         new_device_token = generate_device_token()
@@ -348,8 +541,18 @@ def reregister_device():
 
 @app.route('/verify/qr/<token>')
 def verify_qr(token):
-    # Pagina de verificare a codului QR
-    return render_template('verify_qr.html', token=token)
+    # Pagina de verificare a codului QR; tokenul il citeste scriptul din adresa,
+    # asa ca pagina e aceeasi pentru orice token (service worker-ul o tine ca /verify/qr/shell)
+    return render_template('verify_qr.html')
+
+@app.route('/sw.js')
+def service_worker():
+    # Service worker-ul trebuie servit de la radacina ca sa controleze /scan si /verify/qr/...
+    # Se verifica la fiecare vizita, versiunea noua vine odata cu un build nou
+    folder = STATIC_DIST_DIR if os.path.exists(os.path.join(STATIC_DIST_DIR, 'sw.js')) else app.static_folder
+    response = send_from_directory(folder, 'sw.js', max_age=0)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 #
 
@@ -364,6 +567,7 @@ def student_scan():
     )
 
 @app.route('/api/verify-attendance', methods=['POST'])
+@idempotent
 def verify_attendance():
     # Verifica prezenta pentru un student
     # 1. QR Token Valid
@@ -377,30 +581,17 @@ def verify_attendance():
     longitude = data.get('longitude')
     
     # Luam IP-ul clientului
-    client_ip = request.headers.get('X-Forwarded-For', request.remote_addr)
-    if ',' in client_ip:
-        client_ip = client_ip.split(',')[0].strip()
-
-    # verificam QR codul token valid - se uita baza de date
-    all_tokens = read_qr_tokens()
-    # Vedem tokenurile
-    print('DEBUG: Available QR tokens:', list(all_tokens.keys()))
-    print('DEBUG: Received qr_token:', repr(qr_token))
-    # Se incearca sa se potriveasca tokenul exact, sau cu whitespace eliminat
-    token_match = qr_token
-    if qr_token not in all_tokens:
-        qr_token_stripped = qr_token.strip()
-        if qr_token_stripped in all_tokens:
-            token_match = qr_token_stripped
-        elif qr_token in display_code_to_token:
-            mapped_token = display_code_to_token[qr_token]
-            if mapped_token in all_tokens:
-                token_match = mapped_token
-            else:
-                return jsonify({'success': False, 'error': 'Cod QR invalid sau expirat. Scanati un cod QR nou de la profesor:(.'}), 400
-        else:
-            return jsonify({'success': False, 'error': 'Cod QR invalid sau expirat. Scanati un cod QR nou de la profesor:(.'}), 400
-    qr_data = all_tokens[token_match]
+    ip = client_ip()
+
+    # verificam QR codul token valid - semnatura HMAC sau un singur query dupa cheia primara
+    qr_data = resolve_qr_token(qr_token)
+    if qr_data is None and len(qr_token) == 5 and qr_token.isdigit():
+        # Poate e codul scurt de 5 cifre afisat pe ecran
+        mapped_token = db_resolve_display_code(qr_token)
+        if mapped_token:
+            qr_data = resolve_qr_token(mapped_token)
+    if qr_data is None:
+        return jsonify({'success': False, 'error': 'Cod QR invalid sau expirat. Scanati un cod QR nou de la profesor:(.'}), 400
     token_age = time.time() - qr_data['created_at']
     
     # Se da un timp pentru GPS (+buffer din config)
@@ -410,54 +601,37 @@ def verify_attendance():
     lesson_id = qr_data['lesson_id']
     classroom = qr_data['classroom']
 
-    # Se cauta studentul dupa tokenul dispozitivului
-    devices = read_devices()
-    student_id = None
+    # Se cauta studentul dupa tokenul dispozitivului (idx_devices_token)
     device_token_hash = hash_token(device_token)
-    
-    for sid, device_data in devices.items():
-        # se verifica tokenulz si ca string si dict
-        stored_hash = device_data.get('token_hash') if isinstance(device_data, dict) else device_data
-        if stored_hash == device_token_hash:
-            student_id = sid
-            break
+    student_id, student = db_find_student_by_device(device_token_hash)
     
     if not student_id:
         return jsonify({'success': False, 'error': 'Device-ul nu este inregistrat. Inregistreaza-te prima data.'}), 400
-    
-    # Se verifica daca studentul exista
-    students = read_students()
-    if student_id not in students:
-        return jsonify({'success': False, 'error': 'Student nu exista in sistem, vezi daca esti inregistrat.'}), 400
-    
-    student = students[student_id]
 
-    # Fara duplicari
-    attendance = read_attendance()
-    for record in attendance:
-        if record['barcode_hash'] == student_id and record['lesson_id'] == lesson_id:
-            return jsonify({'success': False, 'error': 'Deja ti-ai facut prezenta aici'}), 400
+    # Fara duplicari (idx_attendance_unique)
+    if db_check_attendance_exists(student_id, lesson_id):
+        return jsonify({'success': False, 'error': 'Deja ti-ai facut prezenta aici'}), 400
     
     # GPS Location este OBLIGATORIU la pidari
     location_valid = False
     ip_valid = False
     
     # Verificare IP - debug logging
-    print(f"[DEBUG] Client IP detected: '{client_ip}'")
+    print(f"[DEBUG] Client IP detected: '{ip}'")
     print(f"[DEBUG] Allowed prefixes: {config.ALLOWED_PUBLIC_IPS}")
     
     for allowed_prefix in config.ALLOWED_PUBLIC_IPS:
-        print(f"[DEBUG] Checking if '{client_ip}' starts with '{allowed_prefix}': {client_ip.startswith(allowed_prefix)}")
-        if client_ip.startswith(allowed_prefix):
+        print(f"[DEBUG] Checking if '{ip}' starts with '{allowed_prefix}': {ip.startswith(allowed_prefix)}")
+        if ip.startswith(allowed_prefix):
             ip_valid = True
             print(f"[DEBUG] IP match found with prefix: {allowed_prefix}")
             break
     
     if not ip_valid:
-        print(f"[DEBUG] IP verification failed for: {client_ip}")
+        print(f"[DEBUG] IP verification failed for: {ip}")
         return jsonify({
             'success': False, 
-            'error': f'IP-ul tau ({client_ip}) nu este permis pentru marcarea prezentei. Conecteaza-te la reteaua universitatii, hai gazul.'
+            'error': f'IP-ul tau ({ip}) nu este permis pentru marcarea prezentei. Conecteaza-te la reteaua universitatii, hai gazul.'
         }), 400
     # Se verifica locatia GPS
     if latitude is None or longitude is None:
@@ -481,14 +655,10 @@ def verify_attendance():
             'error': 'Trebuie sa fii in clasa pentru a marca prezenta. Verifica GPS-ul.'
         }), 400
     
-    # Daca tot bine, se scrie prezenta
-    write_attendance_by_student_id(student_id, lesson_id)
-    
-    # Se actualizeaza cooldown-ul dispozitivului
+    # Daca tot bine, se scrie prezenta si cooldown-ul dispozitivului intr-o singura tranzactie
     # Sa ii oprim pe pidarii care schimba device-ul rapid
-    cooldowns = read_device_cooldowns()
-    cooldowns[device_token_hash] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    write_device_cooldowns(cooldowns)
+    if not db_submit_attendance_with_cooldown(student_id, lesson_id, device_token_hash):
+        return jsonify({'success': False, 'error': 'Deja ti-ai facut prezenta aici'}), 400
     
     return jsonify({
         'success': True,
@@ -505,9 +675,8 @@ def admin_login():
         username = data.get('username', '').strip()
         password = data.get('password', '').strip()
         
-        teachers = read_teachers()
-        if username in teachers:
-            teacher = teachers[username]
+        teacher = db_read_teacher(username)
+        if teacher is not None:
             if hash_password(password) == teacher['password_hash']:
                 session['logged_in'] = True
                 session['username'] = username
@@ -528,11 +697,7 @@ def admin_logout():
 @app.route('/api/admin/check-default-password')
 def check_default_password():
     # Verifica daca un profesor foloseste parola default
-    teachers = read_teachers()
-    for username, teacher in teachers.items():
-        if not teacher.get('password_changed', False):
-            return jsonify({'using_default': True})
-    return jsonify({'using_default': False})
+    return jsonify({'using_default': db_any_default_password()})
 
 def admin_required(f):
     from functools import wraps
@@ -546,32 +711,29 @@ def admin_required(f):
 @app.route('/admin/dashboard')
 @admin_required
 def admin_dashboard():
-    # Admin dashboard cu statistici
-    students = read_students()
-    attendance = read_attendance()
-    devices = read_devices()
-    
-    # Calculeaza statistici
-    total_students = len(students)
-    total_attendance = len(attendance)
-    students_with_devices = len(devices)
+    # Admin dashboard cu statistici, din contoarele tinute la zi de triggere
+    counters = db_read_stats_counters()
     
     # Se iau ultimele 10 inregistrari de prezenta
     recent_attendance = []
-    for record in reversed(attendance[-10:]):
-        student = students.get(record['barcode_hash'], {})
+    for record in db_read_recent_attendance(10):
         recent_attendance.append({
-            'name': f"{student.get('surname', '')} {student.get('name', 'Unknown')}",
-            'group': student.get('group', ''),
+            'name': f"{record['surname'] or ''} {record['name'] or 'Unknown'}",
+            'group': record['group'] or '',
             'lesson_id': record['lesson_id'],
             'timestamp': record['timestamp']
         })
     
+    # Lectiile din saptamana curenta (de luni), cu numarul de prezenti
+    week_start = (datetime.now() - timedelta(days=datetime.now().weekday())).strftime('%Y-%m-%d')
+    week_end = (datetime.strptime(week_start, '%Y-%m-%d') + timedelta(days=7)).strftime('%Y-%m-%d')
+    
     stats = {
-        'total_students': total_students,
-        'total_attendance': total_attendance,
-        'students_with_devices': students_with_devices,
-        'recent_attendance': recent_attendance
+        'total_students': counters.get('students', 0),
+        'total_attendance': counters.get('attendance', 0),
+        'students_with_devices': counters.get('devices', 0),
+        'recent_attendance': recent_attendance,
+        'lessons_this_week': db_lessons_between(week_start, week_end)
     }
     
     return render_template('admin/dashboard.html', stats=stats)
@@ -596,43 +758,41 @@ def admin_generate_qr():
         if not session_id:
             session_id = secrets.token_urlsafe(16)
             session_start_time = time.time()
+            # Sesiune noua: lectia se inregistreaza cu sala, profesorul si grupele ei
+            groups = [normalize_group(g) for g in data.get('groups', '').split(',')]
+            db_start_lesson(lesson_id, classroom, session.get('username'), groups,
+                            datetime.fromtimestamp(session_start_time).strftime('%Y-%m-%d %H:%M:%S'))
         else:
             # Pentru cererile de rotire, se foloseste aceeasi sesiune
             session_start_time = data.get('session_start_time', time.time())
         
-        # Generare token QR si salvare in stocare persistenta
-        qr_token = generate_qr_token()
-        token_data = add_qr_token(qr_token, lesson_id, classroom)
-        active_qr_tokens[qr_token] = token_data
-        # Cod scurt de afisat (5 cifre random)
-        import random
-        display_code = str(random.randint(10000, 99999))
+        # Generare token QR: semnat (fara baza de date) sau salvat in stocare persistenta
+        created_at = time.time()
+        if config.QR_TOKEN_MODE == 'signed':
+            qr_token = sign_qr_token(lesson_id, classroom, created_at)
+            token_row = None
+        else:
+            qr_token = generate_qr_token()
+            token_row = (lesson_id, classroom, created_at)
+        display_code = assign_display_code(
+            qr_token, created_at + config.TOKEN_VALIDITY_SECONDS + config.QR_TOKEN_BUFFER_SECONDS, token_row
+        )
         
         # Se genereaza Codul QR cu URL-ul de verificare
+        # 'matrix' si 'svg' sunt mult mai ieftine decat PNG-ul, pagina de generare foloseste 'matrix'
         verify_url = url_for('verify_qr', token=qr_token, _external=True)
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(verify_url)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        img_io = io.BytesIO()
-        img.save(img_io, 'PNG')
-        img_io.seek(0)
-        img_base64 = base64.b64encode(img_io.getvalue()).decode()
-        
-        display_code_to_token[display_code] = qr_token  # Map the display code to the qr_token
-        
-        # Fix: fallback to database if not in memory
-        if qr_token in active_qr_tokens:
-            created_at = active_qr_tokens[qr_token]['created_at']
+        qr_format = data.get('format', 'png')
+        qr_payload = {}
+        if qr_format == 'matrix':
+            qr_payload['qr_matrix'] = qr_matrix(verify_url)
+        elif qr_format == 'svg':
+            qr_payload['qr_svg'] = qr_svg(verify_url)
         else:
-            # Fallback: get from database
-            all_tokens = read_qr_tokens()
-            created_at = all_tokens.get(qr_token, {}).get('created_at', time.time())
-
+            qr_payload['qr_image'] = f'data:image/png;base64,{qr_png_base64(verify_url)}'
+        
         return jsonify({
             'success': True,
-            'qr_image': f'data:image/png;base64,{img_base64}',
+            **qr_payload,
             'qr_token': qr_token,
             'display_code': display_code,
             'expires_at': created_at + config.TOKEN_VALIDITY_SECONDS,
@@ -649,83 +809,37 @@ def admin_generate_qr():
 @app.route('/admin/attendance')
 @admin_required
 def admin_attendance():
-    # Se verifica prezentele cu filtre
-    students = read_students()
-    attendance = read_attendance()
-    
+    # Se verifica prezentele cu filtre, filtrarea si sortarea se fac in SQL
     # Se parseaza filtrele din query string
     date_filter = request.args.get('date', '')
     lesson_filter = request.args.get('lesson', '')
     group_filter = request.args.get('group', '')
     
-    # Se obtin valorile unice pentru filtre
-    # Se sorteaza lectiile dupa data (timestamp-ul cel mai vechi pentru fiecare lectie)
-    lesson_timestamps = {}
-    for r in attendance:
-        lesson_id = r['lesson_id']
-        if lesson_id not in lesson_timestamps or r['timestamp'] < lesson_timestamps[lesson_id]:
-            lesson_timestamps[lesson_id] = r['timestamp']
-    lessons = sorted(lesson_timestamps.keys(), key=lambda x: lesson_timestamps.get(x, ''), reverse=True)
-    groups = sorted(list(set(s['group'] for s in students.values() if s.get('group'))))
+    # Valorile pentru filtre: lectiile (cele mai noi primele, doar ale grupei alese) si grupele, din indexuri
+    lessons = db_list_lessons(group_filter or None)
+    groups = db_list_groups()
     
     # Construim lista de prezenta - afisam toti studentii din grupa selectata cu statusul de prezenta
     attendance_list = []
+    stats = None
+    next_page = None
+    start = request.args.get('start', 1, type=int)
     
     if group_filter and lesson_filter:
         # Cand sunt selectate atat grupa cat si lectia, se afiseaza toti studentii din grupa respectiva
         # cu statusul lor de prezenta pentru lectia specifica, MULTUMIM BIANCAI si LUI DAVID, SUCA E CHIN
-        for student_id, student in students.items():
-            if student.get('group', '') != group_filter:
-                continue
-            
-            # Verifica daca acest student este prezent pentru aceasta lectie
-            is_present = False
-            attendance_timestamp = ''
-            for record in attendance:
-                if record['barcode_hash'] == student_id and record['lesson_id'] == lesson_filter:
-                    # Se referifica filtrul de data
-                    if date_filter and not record['timestamp'].startswith(date_filter):
-                        continue
-                    is_present = True
-                    attendance_timestamp = record['timestamp']
-                    break
-            
+        for student in db_read_group_roster(group_filter, lesson_filter, date_filter or None):
+            is_present = student['timestamp'] is not None
             attendance_list.append({
-                'name': f"{student.get('surname', '')} {student.get('name', 'Unknown')}",
-                'group': student.get('group', ''),
+                'name': f"{student['surname']} {student['name']}",
+                'group': student['group'],
                 'lesson_id': lesson_filter,
-                'timestamp': attendance_timestamp if is_present else '-',
+                'timestamp': student['timestamp'] if is_present else '-',
                 'is_present': is_present,
-                'student_id': student_id
+                'student_id': student['student_id']
             })
-    else:
-        # Daca nu se pune la legacy cum era, se afiseaza doar studentii care au prezenta inregistrata
-        for record in attendance:
-            student = students.get(record['barcode_hash'], {})
-            
-            # Filtrele se aplica
-            if date_filter and not record['timestamp'].startswith(date_filter):
-                continue
-            if lesson_filter and record['lesson_id'] != lesson_filter:
-                continue
-            if group_filter and student.get('group', '') != group_filter:
-                continue
-            
-            attendance_list.append({
-                'name': f"{student.get('surname', '')} {student.get('name', 'Unknown')}",
-                'group': student.get('group', ''),
-                'lesson_id': record['lesson_id'],
-                'timestamp': record['timestamp'],
-                'is_present': True,
-                'student_id': record['barcode_hash']
-            })
-    
-    # Se sorteaza alfabetic dupa nume
-    attendance_list.sort(key=lambda x: x['name'].lower())
-    
-    # Se calculeaza statistici cand se afiseaza grupa completa
-    stats = None
-    if group_filter and lesson_filter:
+        
+        # Se calculeaza statistici cand se afiseaza grupa completa
         total = len(attendance_list)
         present = sum(1 for s in attendance_list if s['is_present'])
         absent = total - present
@@ -735,13 +849,44 @@ def admin_attendance():
             'absenti': absent,
             'procentaj': round((present / total * 100) if total > 0 else 0, 1)
         }
+    else:
+        # Daca nu se pune la legacy cum era, se afiseaza doar studentii care au prezenta inregistrata
+        # Paginat: pagina urmatoare incepe dupa (after_key, after_id) al ultimului rand
+        # (cheia e numele cu o lectie aleasa, altfel timestamp-ul, vezi db_query_attendance)
+        after = None
+        if request.args.get('after_id'):
+            after = (request.args.get('after_key', ''), request.args.get('after_id', 0, type=int))
+        records, next_cursor = db_query_attendance(
+            date_filter or None, lesson_filter or None, group_filter or None,
+            after=after, limit=config.ATTENDANCE_PAGE_SIZE
+        )
+        for record in records:
+            attendance_list.append({
+                'name': f"{record['surname']} {record['name']}",
+                'group': record['group'],
+                'lesson_id': record['lesson_id'],
+                'timestamp': record['timestamp'],
+                'is_present': True,
+                'student_id': record['student_id']
+            })
+        if next_cursor:
+            next_page = {
+                'date': date_filter,
+                'lesson': lesson_filter,
+                'group': group_filter,
+                'after_key': next_cursor[0],
+                'after_id': next_cursor[1],
+                'start': start + len(records)
+            }
     
     return render_template('admin/attendance.html', 
                          attendance=attendance_list,
                          lessons=lessons,
                          groups=groups,
                          stats=stats,
-                         show_status=(group_filter and lesson_filter))
+                         show_status=(group_filter and lesson_filter),
+                         start=start,
+                         next_page=next_page)
 
 @app.route('/api/admin/toggle-attendance', methods=['POST'])
 @admin_required
@@ -783,43 +928,21 @@ def toggle_attendance():
 @app.route('/admin/attendance/export/<format>')
 @admin_required
 def export_attendance(format):
-    # Se exporta inregistrarile de prezenta Excel
-    students = read_students()
-    attendance = read_attendance()
-    
-    # Se iau filtrele din query string
+    # Se exporta inregistrarile de prezenta in streaming, direct din cursorul SQL
+    # Se iau filtrele din query string; from/to (YYYY-MM-DD) pot cuprinde si semestre arhivate
     date_filter = request.args.get('date', '')
+    date_from = request.args.get('from', '')
+    date_to = request.args.get('to', '')
     lesson_filter = request.args.get('lesson', '')
     group_filter = request.args.get('group', '')
-    
-    # Construim lista de prezenta cu informatii despre studenti
-    attendance_list = []
-    for record in attendance:
-        student = students.get(record['barcode_hash'], {})
-        
-        # Se aplica filtrele
-        if date_filter and not record['timestamp'].startswith(date_filter):
-            continue
-        if lesson_filter and record['lesson_id'] != lesson_filter:
-            continue
-        if group_filter and student.get('group', '') != group_filter:
-            continue
-        
-        attendance_list.append({
-            'name': student.get('name', 'Unknown'),
-            'surname': student.get('surname', ''),
-            'group': student.get('group', ''),
-            'lesson_id': record['lesson_id'],
-            'timestamp': record['timestamp']
-        })
-    
-    # Se pun alfabietic dupa prenume
-    attendance_list.sort(key=lambda x: (x['surname'].lower(), x['name'].lower()))
+    filters = (date_filter or None, lesson_filter or None, group_filter or None, date_from or None, date_to or None)
     
     # Se genereaza numele fisierului
     filename_parts = ['Prezenta']
     if date_filter:
         filename_parts.append(date_filter)
+    if date_from or date_to:
+        filename_parts.append(f'{date_from}--{date_to}')
     if lesson_filter:
         filename_parts.append(lesson_filter)
     if group_filter:
@@ -827,80 +950,61 @@ def export_attendance(format):
     filename_base = '_'.join(filename_parts)
     
     if format == 'excel':
-        # Se genereaza fisier Excel bine organizat, grupat pe grupe, Totul ca la carte!!
-        output = io.StringIO()
-        
-        # PE GRUPE
-        grouped_attendance = {}
-        for record in attendance_list:
-            group = record['group'] or 'Idee n-am'
-            if group not in grouped_attendance:
-                grouped_attendance[group] = []
-            grouped_attendance[group].append(record)
-        
-        # Se sorteaza grupele alfabetic
-        sorted_groups = sorted(grouped_attendance.keys())
-        
-        # Functie ajutatoare pentru a completa coloanele cu spatii, sa arate bine
-        def pad(text, width):
-            return str(text).ljust(width)
-        
-        # Latimi coloane
-        col_num = 5
-        col_name = 20
-        col_surname = 20
-        col_lesson = 20
-        col_timestamp = 22
-        
-        # Scriem titlul si informatiile de filtru
-        output.write('Raport cu prezentele:)\n')
-        output.write(f'Generat la :      {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}\n')
-        if date_filter:
-            output.write(f'Data:    {date_filter}\n')
-        if lesson_filter:
-            output.write(f'Lectia:  {lesson_filter}\n')
-        if group_filter:
-            output.write(f'Grupa:   {group_filter}\n')
-        output.write('\n')
-        
-        # Scriem rezumat
-        output.write('Rezumat\n')
-        output.write(f'Toate inregistrarile:  {len(attendance_list)}\n')
-        output.write(f'Total Grupi:   {len(sorted_groups)}\n')
-        output.write('\n')
-        output.write('=' * 90 + '\n')
-        output.write('\n')
-        
-        # Scriem datele organizate pe grupe
-        for group in sorted_groups:
-            group_records = grouped_attendance[group]
-            
-            # Se sorteaza inregistrarile din grupa dupa prenume si nume
-            group_records.sort(key=lambda x: (x['surname'].lower(), x['name'].lower()))
-            
-            # Antet grupa
-            output.write(f'GRUPA: {group}    (Studenti: {len(group_records)})\n')
-            output.write('-' * 90 + '\n')
-            
-            # Antet coloane
-            output.write(f'{pad("#", col_num)}{pad("Prenume", col_surname)}{pad("Nume", col_name)}{pad("Lectia", col_lesson)}{pad("Timestamp", col_timestamp)}\n')
-            output.write('-' * 90 + '\n')
-            
-            # Date grupa
-            for i, record in enumerate(group_records, 1):
-                output.write(f'{pad(i, col_num)}{pad(record["surname"], col_surname)}{pad(record["name"], col_name)}{pad(record["lesson_id"], col_lesson)}{pad(record["timestamp"], col_timestamp)}\n')
-            
-            output.write('\n')
-        
-        output.seek(0)
-        
-        # Se adauga BOM pentru UTF-8 la Excel
-        response = make_response('\ufeff' + output.getvalue())
-        response.headers['Content-Type'] = 'application/vnd.ms-excel; charset=utf-8'
-        response.headers['Content-Disposition'] = f'attachment; filename={filename_base}.xls'
-        return response
+        # Raportul text grupat pe grupe, Totul ca la carte!! (vechiul .xls)
+        group_counts = db_count_attendance_by_group(*filters)
+        period = date_filter or (f'{date_from} - {date_to}' if date_from or date_to else '')
+        body = text_report(db_iter_attendance_export(*filters), group_counts, period, lesson_filter, group_filter)
+        content_type = 'application/vnd.ms-excel; charset=utf-8'
+        extension = 'xls'
+    elif format == 'csv':
+        body = csv_report(db_iter_attendance_export(*filters))
+        content_type = 'text/csv; charset=utf-8'
+        extension = 'csv'
+    elif format == 'xlsx':
+        body = xlsx_report(db_iter_attendance_export(*filters))
+        content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        extension = 'xlsx'
+    else:
+        return jsonify({'success': False, 'error': 'Format invalid, ceva nu e in regula'}), 400
     
-    return jsonify({'success': False, 'error': 'Format invalid, ceva nu e in regula'}), 400
+    response = Response(stream_with_context(body), content_type=content_type)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename_base}.{extension}'
+    return response
+
+@app.route('/admin/attendance/matrix')
+@admin_required
+def admin_attendance_matrix():
+    # Grila pe semestru pentru o grupa: studentii pe randuri, lectiile pe coloane, cu procentaje
+    group_filter = request.args.get('group', '')
+    date_from = request.args.get('from', '')
+    date_to = request.args.get('to', '')
+    matrix = build_attendance_matrix(group_filter, date_from or None, date_to or None) if group_filter else None
+    return render_template('admin/attendance_matrix.html', groups=db_list_groups(), matrix=matrix)
+
+@app.route('/admin/attendance/matrix/export/<format>')
+@admin_required
+def export_attendance_matrix(format):
+    # Grila grupei ca CSV sau XLSX, acelasi format ca pagina
+    group_filter = request.args.get('group', '')
+    date_from = request.args.get('from', '')
+    date_to = request.args.get('to', '')
+    if not group_filter:
+        return jsonify({'success': False, 'error': 'Alege o grupa'}), 400
+    matrix = build_attendance_matrix(group_filter, date_from or None, date_to or None)
+
+    filename_base = '_'.join(['Matrice', group_filter] + ([f'{date_from}--{date_to}'] if date_from or date_to else []))
+    if format == 'csv':
+        body = csv_report(matrix.table_rows(), matrix.table_columns(), list)
+        content_type = 'text/csv; charset=utf-8'
+    elif format == 'xlsx':
+        body = xlsx_report(matrix.table_rows(), group_filter, matrix.table_columns(), list)
+        content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        return jsonify({'success': False, 'error': 'Format invalid, ceva nu e in regula'}), 400
+
+    response = Response(stream_with_context(body), content_type=content_type)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename_base}.{format}'
+    return response
 
 @app.route('/admin/students', methods=['GET', 'POST'])
 @admin_required
@@ -912,23 +1016,15 @@ def admin_students():
         if action == 'add':
             name = request.json.get('name', '').strip()
             surname = request.json.get('surname', '').strip()
-            group = request.json.get('group', '').strip()
+            group = normalize_group(request.json.get('group'))
             barcode = request.json.get('barcode', '').strip()  # Optional
             
-            if not all([name, surname, group]):
-                return jsonify({'success': False, 'error': 'Numele, prenumele si grupa trebuie completate'}), 400
-
-            # Validate no pipe characters (used as delimiter in storage)
-            if any('|' in field for field in [name, surname, group]):
-                return jsonify({'success': False, 'error': 'Name, surname, and group nu pot contine |'}), 400
-            
-            # Validate barcode only if provided
-            if barcode and (len(barcode) != 8 or not barcode.isdigit()):
-                return jsonify({'success': False, 'error': 'Barcode trebuie sa aiba 8 cifre'}), 400
+            error = validate_student_fields(name, surname, group, barcode)
+            if error:
+                return jsonify({'success': False, 'error': error}), 400
             
-            students = read_students()
             student_id = generate_student_id(name, surname, group)
-            if student_id in students:
+            if db_student_exists(student_id):
                 return jsonify({'success': False, 'error': 'Studentul exista deja'}), 400
             
             # Barcodule este Hashuit intern
@@ -937,9 +1033,8 @@ def admin_students():
         
         elif action == 'delete':
             student_id = request.json.get('student_id', '').strip()
-            students = read_students()
             
-            if student_id not in students:
+            if not db_student_exists(student_id):
                 return jsonify({'success': False, 'error': 'Studentul nu a fost gasit:('}), 400
 
             # Se sterge studentul din baza de date
@@ -977,6 +1072,32 @@ def admin_students():
     
     return render_template('admin/students.html', students=students_list)
 
+@app.route('/admin/students/import', methods=['POST'])
+@admin_required
+def admin_import_students():
+    # Import in bloc de studenti: fisier CSV (campul 'file') sau JSON {'rows': [...]}
+    # CSV-ul are antet cu coloanele name, surname, group si optional barcode
+    if 'file' in request.files:
+        text = request.files['file'].read().decode('utf-8-sig', errors='replace')
+        reader = csv.DictReader(io.StringIO(text))
+        columns = {c.strip().lower() for c in (reader.fieldnames or [])}
+        if not {'name', 'surname', 'group'} <= columns:
+            return jsonify({'success': False, 'error': 'CSV-ul trebuie sa aiba coloanele name, surname, group (si optional barcode)'}), 400
+        rows = [{(k or '').strip().lower(): v for k, v in row.items()} for row in reader]
+    else:
+        rows = (request.get_json(silent=True) or {}).get('rows')
+        if not isinstance(rows, list):
+            return jsonify({'success': False, 'error': 'Trimite un fisier CSV sau o lista de randuri'}), 400
+    
+    report = import_students(rows)
+    summary = {status: sum(1 for r in report if r['status'] == status) for status in ('added', 'exists', 'error')}
+    return jsonify({
+        'success': True,
+        'message': f"Adaugati: {summary['added']}, existau deja: {summary['exists']}, erori: {summary['error']}",
+        'summary': summary,
+        'report': report
+    })
+
 @app.route('/admin/settings', methods=['GET', 'POST'])
 @admin_required
 def admin_settings():
@@ -1008,8 +1129,8 @@ def admin_settings():
 
             # Se verifica parola curenta
             username = session.get('username')
-            teachers = read_teachers()
-            if username not in teachers or hash_password(current_password) != teachers[username]['password_hash']:
+            teacher = db_read_teacher(username)
+            if teacher is None or hash_password(current_password) != teacher['password_hash']:
                 return jsonify({'success': False, 'error': 'Parola nu este corecta'}), 401
             
             # Se actualizeaza parola
@@ -1042,12 +1163,8 @@ def admin_registration_qr():
         host = request.headers.get('Host', request.host)
         registration_url = f"{proto}://{host}/register"
 
-        # Se genereaza imaginea QR
-        qr_img = qrcode.make(registration_url)
-        img_bytes = io.BytesIO()
-        qr_img.save(img_bytes, format='PNG')
-        img_bytes.seek(0)
-        qr_base64 = base64.b64encode(img_bytes.read()).decode('utf-8')
+        # Se genereaza imaginea QR (din cache daca URL-ul e acelasi)
+        qr_base64 = qr_png_base64(registration_url, border=4)
 
         return render_template('admin/generate_registration_qr.html',
                                                      registration_url=registration_url,
@@ -1059,17 +1176,8 @@ def admin_registration_qr():
 @admin_required
 def scanner_check_student(barcode):
     # Verifica daca studentul exista si returneaza informatiile sale (doar admin)
-    students = read_students()
-    barcode_hash = hash_barcode(barcode)
-    
-    # Se cauta studentul dupa hash-ul codului de bare stocat
-    found_student = None
-    found_student_id = None
-    for student_id, student in students.items():
-        if student.get('barcode') == barcode_hash:
-            found_student = student
-            found_student_id = student_id
-            break
+    # Se cauta studentul dupa hash-ul codului de bare stocat (idx_students_barcode)
+    found_student_id, found_student = db_find_student_by_barcode(hash_barcode(barcode))
     
     if not found_student:
         return jsonify({'success': False, 'error': 'Studentul nu a fost gasit:('}), 404
@@ -1099,30 +1207,15 @@ def scanner_mark_attendance():
         return jsonify({'success': False, 'error': 'Trebui sa completezi tot'}), 400
     
     # Se verifica daca studentul exista cautand hash-ul codului de bare, pentru temosi
-    students = read_students()
-    barcode_hash = hash_barcode(barcode)
-    
-    found_student = None
-    found_student_id = None
-    for student_id, student in students.items():
-        if student.get('barcode') == barcode_hash:
-            found_student = student
-            found_student_id = student_id
-            break
+    found_student_id, student = db_find_student_by_barcode(hash_barcode(barcode))
     
-    if not found_student:
+    if not student:
         return jsonify({'success': False, 'error': 'Studentul nu a fost gasit in sistem:('}), 404
     
-    student = found_student
-    
-    # Se verifica daca prezenta a fost deja marcata
-    attendance = read_attendance()
-    for record in attendance:
-        if record['barcode_hash'] == found_student_id and record['lesson_id'] == lesson_id:
-            return jsonify({'success': False, 'error': 'Deja sa facut prezenta la tine'}), 400
-    
     # Se marcheaza prezenta folosind student_id pentru consistenta
-    write_attendance_by_student_id(found_student_id, lesson_id)
+    # Daca a fost deja marcata, idx_attendance_unique refuza insertul
+    if not db_write_attendance(found_student_id, lesson_id):
+        return jsonify({'success': False, 'error': 'Deja sa facut prezenta la tine'}), 400
     
     return jsonify({
         'success': True,
@@ -1134,27 +1227,59 @@ def scanner_mark_attendance():
         }
     })
 
-# Curatare in general a programei
+@app.route('/api/scanner/check-and-mark', methods=['POST'])
+def scanner_check_and_mark():
+    # Verificare + marcare intr-o singura cerere, pentru coada de carduri de la usa (doar admin)
+    # Raspunsul are mereu informatiile studentului daca a fost gasit, plus rezultatul marcarii
+    if not session.get('logged_in'):
+        return jsonify({'success': False, 'error': 'Neautorizat'}), 401
+    
+    data = request.json
+    barcode = data.get('barcode', '').strip()
+    lesson_id = data.get('lesson_id', '').strip()
+    
+    if not barcode or not lesson_id:
+        return jsonify({'success': False, 'error': 'Trebui sa completezi tot'}), 400
+    
+    found_student_id, student = db_find_student_by_barcode(hash_barcode(barcode))
+    if not student:
+        return jsonify({'success': False, 'error': 'Nu sa gasit asa student'}), 404
+    
+    student_info = {
+        'name': student['name'],
+        'surname': student['surname'],
+        'group': student['group'],
+        'barcode': barcode
+    }
+    if not db_write_attendance(found_student_id, lesson_id):
+        return jsonify({'success': False, 'student': student_info, 'error': 'Deja sa facut prezenta la tine'}), 400
+    
+    return jsonify({
+        'success': True,
+        'student': student_info,
+        'message': f'Prezenta sa facut cu succes pentru {student["name"]} {student["surname"]}, super:)'
+    })
+
+# Curatare in general a programei, din thread-ul de mentenanta (maintenance.py), nu din cereri
 
 def cleanup_expired_tokens():
-    # Se curata tokenurile QR expirate periodic
     # Se curata tokenurile QR, sa nu creasca la infinit
     db_cleanup_qr_tokens(config.TOKEN_VALIDITY_SECONDS + 10)
-    
+
+def cleanup_expired_cooldowns():
     # Se curata cooldown-urile dispozitivelor, sa nu creasca la infinit
     db_cleanup_device_cooldowns(config.DEVICE_REREGISTER_COOLDOWN_SECONDS)
-    
-    # Se actualizeaza in-memory 
-    active_qr_tokens.clear()
-    active_qr_tokens.update(read_qr_tokens())
 
-@app.before_request
-def before_request():
-    # Se ruleaza inainte de fiecare cerere
-    # Se incaraca tokenurile QR active in memorie daca nu sunt deja incarcate
-    if not active_qr_tokens:
-        active_qr_tokens.update(read_qr_tokens())
-    cleanup_expired_tokens()
+def cleanup_expired_display_codes():
+    # Se sterg codurile scurte expirate
+    db_cleanup_display_codes()
+
+maintenance = MaintenanceScheduler(
+    config.MAINTENANCE_INTERVAL_SECONDS,
+    default_lock_path(),
+    shared_jobs=[cleanup_expired_tokens, cleanup_expired_cooldowns, cleanup_expired_display_codes]
+)
+maintenance.start()
 
 @app.route('/debug-test') #Pentru testare erori in debug, HIHIC
 def debug_test():
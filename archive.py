@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Arhivarea prezentelor pe semestre
+Utilizare:
+    python3 archive.py create 2025-S1 --before 2026-02-01 [--vacuum]
+    python3 archive.py list
+
+Prezentele de dinainte de --before se muta in data/archive/<nume>.db, baza live ramane doar cu semestrul curent.
+Rapoartele si exporturile care cer o data (sau o lectie) dintr-un semestru arhivat ataseaza arhiva automat (read-only).
+"""
+
+import argparse
+import os
+import re
+import sys
+from datetime import datetime
+
+# Se adauga calea curenta pentru a importa modulul database
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import config
+from database import init_database, db_archive_attendance, db_list_archives, db_vacuum
+
+
+def create_archive(name, before, vacuum=False):
+    if not re.fullmatch(r'[\w.-]+', name):
+        print(f"Eroare: numele '{name}' poate contine doar litere, cifre, '.', '-' si '_'")
+        return False
+    try:
+        datetime.strptime(before, '%Y-%m-%d')
+    except ValueError:
+        print(f"Eroare: data '{before}' trebuie sa fie YYYY-MM-DD")
+        return False
+
+    path = os.path.join(config.ARCHIVE_DIR, f'{name}.db')
+    try:
+        moved = db_archive_attendance(name, before, path)
+    except ValueError as e:
+        print(f"Eroare: {e}")
+        return False
+
+    if not moved:
+        print(f"Nici o prezenta inainte de {before}, nu s-a creat nici o arhiva")
+        return True
+    print(f"{moved} prezente mutate in {path}")
+    if vacuum:
+        db_vacuum()
+        print("Baza live a fost compactata (VACUUM)")
+    return True
+
+
+def list_archives():
+    archives = db_list_archives()
+    if not archives:
+        print("Nici un semestru arhivat")
+    for archive in archives:
+        print(f"{archive['name']:<16}{archive['start_date']} -> {archive['end_date']}  "
+              f"{archive['rows']:>8} prezente  {archive['path']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Arhivarea prezentelor pe semestre')
+    commands = parser.add_subparsers(dest='command', required=True)
+    create = commands.add_parser('create', help='Muta prezentele vechi intr-o arhiva noua')
+    create.add_argument('name', help='Numele semestrului, de ex. 2025-S1')
+    create.add_argument('--before', required=True, help='Se arhiveaza prezentele de dinainte de data asta (YYYY-MM-DD)')
+    create.add_argument('--vacuum', action='store_true', help='Compacteaza baza live dupa arhivare')
+    commands.add_parser('list', help='Semestrele arhivate')
+    args = parser.parse_args()
+
+    init_database()
+    if args.command == 'create':
+        sys.exit(0 if create_archive(args.name, args.before, args.vacuum) else 1)
+    list_archives()
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Benchmark pentru inceputul unei lectii: N studenti scaneaza un QR care se roteste
+Utilizare:
+    python3 benchmarks/burst.py --server flask --scenario verify --requests 300
+    python3 benchmarks/burst.py --server gunicorn --scenario register --requests 500 --concurrency 100 --spread 0
+
+Serverul se porneste pe o baza de date separata (data/bench.db, generata cu seed.py daca lipseste
+sau daca a fost generata cu alt --students/--lessons). Pentru gunicorn se foloseste comanda din run.sh, doar cu alt port.
+La final se afiseaza throughput, latenta p50/p95/p99, cat a asteptat un writer dupa lock-ul de scriere
+in timpul burst-ului (proba cu BEGIN IMMEDIATE, vezi LockProbe) si de cate ori serverul a renuntat
+dupa tot busy_timeout-ul ('database is locked').
+"""
+
+import argparse
+import os
+import random
+import shlex
+import shutil
+import signal
+import sqlite3
+import subprocess
+import sys
+import threading
+import glob
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config
+from benchmarks.seed import device_token, read_seed_parameters
+
+ADMIN_USERNAME = 'admin'
+ADMIN_PASSWORD = 'admin123'
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def gunicorn_command(port):
+    # Comanda din run.sh, cu bind-ul mutat pe portul benchmark-ului
+    with open(os.path.join(ROOT, 'run.sh')) as f:
+        line = next(l for l in f if 'gunicorn' in l)
+    args = shlex.split(line)
+    if not os.path.exists(os.path.join(ROOT, args[0])):
+        args[0] = shutil.which('gunicorn') or 'gunicorn'
+    for flag in ('-b', '--bind'):
+        if flag in args:
+            args[args.index(flag) + 1] = f'127.0.0.1:{port}'
+            break
+    else:
+        args[1:1] = ['-b', f'127.0.0.1:{port}']
+    return args
+
+
+def flask_command(port):
+    return [sys.executable, '-c',
+            f'from app import app; app.run(host="127.0.0.1", port={port}, threaded=True, debug=False)']
+
+
+class Server:
+    # Porneste serverul intr-un subproces si pastreaza log-ul pentru numararea lock-urilor
+
+    def __init__(self, kind, port, db_path, log_path):
+        self.kind = kind
+        self.port = port
+        self.db_path = db_path
+        self.log_path = log_path
+        self.base_url = f'http://127.0.0.1:{port}'
+        self.process = None
+
+    def __enter__(self):
+        env = dict(os.environ, ATTENDANCE_DB=os.path.abspath(self.db_path), DEBUG='False')
+        command = gunicorn_command(self.port) if self.kind == 'gunicorn' else flask_command(self.port)
+        self._log = open(self.log_path, 'w')
+        self.process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=self._log, stderr=subprocess.STDOUT)
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                requests.get(self.base_url + '/', timeout=1)
+                return self
+            except requests.ConnectionError:
+                if self.process.poll() is not None:
+                    break
+                time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise RuntimeError(f'Serverul nu a pornit, vezi {self.log_path}')
+
+    def __exit__(self, *exc):
+        if self.process and self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self._log.close()
+
+    def busy_timeouts(self):
+        # Scrierile care au asteptat tot DB_BUSY_TIMEOUT_MS si au esuat; asteptarile mai scurte nu apar in log
+        with open(self.log_path, errors='replace') as f:
+            return sum(line.count('database is locked') for line in f)
+
+
+class LockProbe:
+    # Masoara contentia pe lock-ul de scriere cat timp ruleaza burst-ul: la fiecare `interval` secunde
+    # un BEGIN IMMEDIATE (ia lock-ul de scriere, asteptand cat il tine serverul) urmat de ROLLBACK
+    # Durata lui BEGIN IMMEDIATE = cat ar fi asteptat o scriere a serverului in acel moment;
+    # proba tine lock-ul doar cateva microsecunde, deci aproape nu adauga contentie
+
+    def __init__(self, db_path, interval=0.02):
+        self.db_path = db_path
+        self.interval = interval
+        self.waits = []
+        self.timeouts = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, timeout=config.DB_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        try:
+            while not self._stop.wait(self.interval):
+                t0 = time.perf_counter()
+                try:
+                    conn.execute('BEGIN IMMEDIATE')
+                except sqlite3.OperationalError:
+                    self.timeouts += 1
+                    continue
+                self.waits.append((time.perf_counter() - t0) * 1000)
+                conn.execute('ROLLBACK')
+        finally:
+            conn.close()
+
+
+def admin_session(base_url):
+    session = requests.Session()
+    response = session.post(base_url + '/admin/login', json={'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD})
+    if response.status_code != 200:
+        raise RuntimeError('Login admin esuat (baza de date trebuie creata de la zero ca sa existe admin/admin123)')
+    return session
+
+
+def run_timed(jobs, concurrency, spread):
+    # Ruleaza joburile cu `concurrency` threaduri, fiecare pornit la un offset random in [0, spread)
+    # Returneaza (latente in ms, coduri HTTP, durata totala)
+    offsets = sorted(random.uniform(0, spread) for _ in jobs) if spread > 0 else [0.0] * len(jobs)
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    started = time.perf_counter()
+
+    def run(job_and_offset):
+        job, offset = job_and_offset
+        delay = started + offset - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        t0 = time.perf_counter()
+        try:
+            status = job()
+        except requests.RequestException:
+            status = 'conexiune'
+        elapsed = (time.perf_counter() - t0) * 1000
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(run, zip(jobs, offsets)))
+    return sorted(latencies), statuses, time.perf_counter() - started
+
+
+def scenario_verify(base_url, args):
+    # Un profesor roteste QR-ul, N studenti diferiti scaneaza in fereastra de validitate
+    admin = admin_session(base_url)
+    classroom_name, classroom = next(iter(config.CLASSROOMS.items()))
+    lesson_id = f'BENCH-{int(time.time())}'
+    current = {}
+    stop = threading.Event()
+
+    def rotate():
+        session_data = {'lesson_id': lesson_id, 'classroom': classroom_name}
+        while not stop.is_set():
+            result = admin.post(base_url + '/admin/generate-qr', json=session_data).json()
+            current['token'] = result['qr_token']
+            session_data.update(session_id=result['session_id'], session_start_time=result['session_start_time'])
+            stop.wait(config.TOKEN_VALIDITY_SECONDS)
+
+    rotator = threading.Thread(target=rotate, daemon=True)
+    rotator.start()
+    while 'token' not in current:
+        time.sleep(0.05)
+
+    client_ip = config.ALLOWED_PUBLIC_IPS[0] + '1.1'
+    local = threading.local()
+
+    def make_job(i):
+        def job():
+            if not hasattr(local, 'session'):
+                local.session = requests.Session()
+            response = local.session.post(base_url + '/api/verify-attendance', headers={'X-Forwarded-For': client_ip}, json={
+                'qr_token': current['token'],
+                'device_token': device_token(i),
+                'latitude': classroom['lat'],
+                'longitude': classroom['lng']
+            })
+            return response.status_code
+        return job
+
+    students = random.sample(range(args.students), min(args.requests, args.students))
+    try:
+        return run_timed([make_job(i) for i in students], args.concurrency, args.spread)
+    finally:
+        stop.set()
+
+
+def scenario_register(base_url, args):
+    # N studenti noi se inregistreaza simultan (codul QR de inregistrare pe proiector)
+    # O parte retrimit aceeasi inregistrare (raspuns lent, au apasat din nou); acelea trebuie sa ia 400,
+    # deci la final: 200 = cate inregistrari unice, 400 = cate retrimiteri, nici un student dublat
+    run_id = int(time.time() * 1000)
+    local = threading.local()
+
+    def make_job(i):
+        def job():
+            if not hasattr(local, 'session'):
+                local.session = requests.Session()
+            response = local.session.post(base_url + '/register', json={
+                'name': f'Nou{i}', 'surname': f'Reg{run_id}', 'group': 'BENCH',
+                'device_token': f'bench-register-{run_id}-{i}'
+            })
+            return response.status_code
+        return job
+
+    students = list(range(args.requests))
+    retries = random.sample(students, int(args.requests * args.retry_rate))
+    jobs = [make_job(i) for i in students + retries]
+    random.shuffle(jobs)
+    return run_timed(jobs, args.concurrency, args.spread)
+
+
+def scenario_generate_qr(base_url, args):
+    # Multe ecrane de profesor rotesc QR-ul in acelasi timp
+    admin = admin_session(base_url)
+    classroom_name = next(iter(config.CLASSROOMS))
+
+    def make_job(i):
+        def job():
+            response = admin.post(base_url + '/admin/generate-qr', json={'lesson_id': f'QR-{i % 50}', 'classroom': classroom_name})
+            return response.status_code
+        return job
+
+    return run_timed([make_job(i) for i in range(args.requests)], args.concurrency, args.spread)
+
+
+SCENARIOS = {
+    'verify': scenario_verify,
+    'register': scenario_register,
+    'generate-qr': scenario_generate_qr,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pentru burst-ul de la inceputul lectiei')
+    parser.add_argument('--server', choices=['flask', 'gunicorn'], default='flask')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='verify')
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--spread', type=float, default=None,
+                        help='Secunde pe care se imprastie cererile (implicit TOKEN_VALIDITY_SECONDS + QR_TOKEN_BUFFER_SECONDS pentru verify, 0 altfel)')
+    parser.add_argument('--db', default=os.path.join(ROOT, 'data', 'bench.db'))
+    parser.add_argument('--students', type=int, default=3000, help='Studenti generati de seed.py')
+    parser.add_argument('--lessons', type=int, default=60)
+    parser.add_argument('--reseed', action='store_true', help='Sterge si regenereaza baza de date')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--retry-rate', type=float, default=0.1,
+                        help='register: cat din N retrimite aceeasi inregistrare (asteptat 400)')
+    args = parser.parse_args()
+
+    if args.spread is None:
+        args.spread = (config.TOKEN_VALIDITY_SECONDS + config.QR_TOKEN_BUFFER_SECONDS) if args.scenario == 'verify' else 0
+
+    if not args.reseed and os.path.exists(args.db):
+        # O baza generata cu alti parametri ar da tokenuri de device care nu exista (400 inselatoare la verify)
+        seeded = read_seed_parameters(args.db)
+        if seeded is None or tuple(seeded[:2]) != (args.students, args.lessons):
+            print(f'{args.db} nu e generata cu --students {args.students} --lessons {args.lessons} '
+                  f'(are {seeded}), se regenereaza')
+            args.reseed = True
+    if args.reseed:
+        # Si fisierele de langa baza (-wal, -shm, cache-urile), altfel ar ramane starea bazei vechi
+        for path in [args.db] + glob.glob(glob.escape(args.db) + '-*'):
+            os.remove(path)
+    if not os.path.exists(args.db):
+        subprocess.run([sys.executable, os.path.join(ROOT, 'benchmarks', 'seed.py'), args.db,
+                        '--students', str(args.students), '--lessons', str(args.lessons)], cwd=ROOT, check=True)
+
+    log_path = os.path.splitext(args.db)[0] + f'-{args.server}.log'
+    with Server(args.server, args.port, args.db, log_path) as server:
+        with LockProbe(args.db) as probe:
+            latencies, statuses, duration = SCENARIOS[args.scenario](server.base_url, args)
+        busy_timeouts = server.busy_timeouts()
+    waits = sorted(probe.waits)
+
+    print(f'scenariu={args.scenario} server={args.server} cereri={len(latencies)} concurenta={args.concurrency} spread={args.spread}s')
+    print(f'throughput: {len(latencies) / duration:.1f} cereri/s  (durata {duration:.2f}s)')
+    print(f'latenta ms: p50={percentile(latencies, 50):.1f}  p95={percentile(latencies, 95):.1f}  '
+          f'p99={percentile(latencies, 99):.1f}  max={latencies[-1] if latencies else 0:.1f}')
+    print('coduri HTTP: ' + ', '.join(f'{status}={count}' for status, count in sorted(statuses.items(), key=str)))
+    contended = sum(1 for wait in waits if wait >= 1)
+    print(f'asteptare lock de scriere ms (proba BEGIN IMMEDIATE, {len(waits)} probe, {contended} >= 1ms): '
+          f'p50={percentile(waits, 50):.2f}  p95={percentile(waits, 95):.2f}  p99={percentile(waits, 99):.2f}  '
+          f'max={waits[-1] if waits else 0:.2f}  probe expirate={probe.timeouts}')
+    print(f'SQLite busy timeouts in server (database is locked dupa {config.DB_BUSY_TIMEOUT_MS} ms): {busy_timeouts}')
+
+
+if __name__ == '__main__':
+    main()
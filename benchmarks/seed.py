@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Genereaza o baza de date sintetica pentru benchmark-uri
+Utilizare: python3 benchmarks/seed.py data/bench.db [--students 3000] [--lessons 60]
+
+Fiecare student are un device cu tokenul 'bench-device-<i>' si prezente la ~80% din lectiile grupei lui,
+adica un semestru intreg de date. Parametrii se tin in tabela bench_seed (vezi read_seed_parameters),
+ca burst.py sa nu refoloseasca o baza generata cu alti parametri.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from database import MEMORY_DATABASE, configure_database, init_database, db_connection
+
+GROUP_SIZE = 30
+
+
+def device_token(i):
+    # Tokenul de device pe care il trimite telefonul studentului i in benchmark
+    return f'bench-device-{i}'
+
+
+def read_seed_parameters(path):
+    # (studenti, lectii, rata de prezenta) cu care a fost generata baza, sau None (baza veche / alta baza)
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT students, lessons, attendance_rate FROM bench_seed').fetchone()
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+
+
+def seed_database(path, students=3000, lessons=60, attendance_rate=0.8, seed=42):
+    # Se umple baza de date de la `path` cu studenti, device-uri si prezente
+    # path poate fi si ':memory:'; cu path=None se foloseste engine-ul deja configurat in proces
+    if path is not None:
+        if path != MEMORY_DATABASE:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        configure_database(path)
+    init_database()
+
+    from app import generate_student_id, hash_token
+
+    rng = random.Random(seed)
+    now = time.time()
+    semester_start = now - 120 * 24 * 3600
+
+    student_rows = []
+    device_rows = []
+    attendance_rows = []
+    for i in range(students):
+        group = f'B{i // GROUP_SIZE:03d}'
+        name, surname = f'Student{i}', f'Bench{i}'
+        student_id = generate_student_id(name, surname, group)
+        created = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(semester_start))
+        student_rows.append((student_id, name, surname, group, '', created))
+        device_rows.append((student_id, hash_token(device_token(i)), created, 'bench', 'mobile'))
+        for j in range(lessons):
+            if rng.random() < attendance_rate:
+                lesson_time = semester_start + j * 2 * 24 * 3600
+                attendance_rows.append((
+                    student_id,
+                    f'{group}-L{j:02d}',
+                    time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(lesson_time))
+                ))
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        # Tabela doar a bazei de benchmark, in afara migrarilor
+        cursor.execute('CREATE TABLE IF NOT EXISTS bench_seed (students INTEGER, lessons INTEGER, attendance_rate REAL)')
+        cursor.execute('DELETE FROM bench_seed')
+        cursor.execute('INSERT INTO bench_seed VALUES (?, ?, ?)', (students, lessons, attendance_rate))
+        cursor.executemany('''
+            INSERT OR IGNORE INTO students (id, name, surname, group_name, barcode_hash, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', student_rows)
+        cursor.executemany('INSERT OR IGNORE INTO lessons (lesson_id, started_at) VALUES (?, ?)',
+                           sorted({(lesson_id, timestamp) for _, lesson_id, timestamp in attendance_rows}))
+        # Cheile INTEGER, o singura data, ca sa nu facem subquery pe fiecare rand
+        student_pks = dict(cursor.execute('SELECT id, pk FROM students').fetchall())
+        lesson_pks = dict(cursor.execute('SELECT lesson_id, pk FROM lessons').fetchall())
+        cursor.executemany('''
+            INSERT OR IGNORE INTO devices (student_pk, token_hash, registered_at, user_agent, device_type)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(student_pks[student_id], *rest) for student_id, *rest in device_rows])
+        cursor.executemany('''
+            INSERT OR IGNORE INTO attendance (student_pk, lesson_pk, timestamp)
+            VALUES (?, ?, ?)
+        ''', [(student_pks[student_id], lesson_pks[lesson_id], timestamp)
+              for student_id, lesson_id, timestamp in attendance_rows])
+
+    return len(student_rows), len(attendance_rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Baza de date sintetica pentru benchmark')
+    parser.add_argument('path', help='Fisierul SQLite (se creeaza daca nu exista)')
+    parser.add_argument('--students', type=int, default=3000)
+    parser.add_argument('--lessons', type=int, default=60, help='Lectii per grupa intr-un semestru')
+    parser.add_argument('--attendance-rate', type=float, default=0.8)
+    args = parser.parse_args()
+
+    started = time.time()
+    n_students, n_attendance = seed_database(args.path, args.students, args.lessons, args.attendance_rate)
+    print(f'{n_students} studenti, {n_attendance} prezente in {args.path} ({time.time() - started:.1f}s)')
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Build pentru fisierele statice
+Utilizare:
+    python3 build_static.py
+
+Fiecare fisier din static/ se copiaza in static/dist/ cu hash-ul continutului in nume (scan.3f2a91c0d1.js),
+plus o varianta .gz pentru nginx (gzip_static). Numele nu se schimba cat timp continutul e acelasi,
+deci se pot tine in cache la nesfarsit. static/dist/assets.json leaga numele originale de cele cu hash
+(asset_url() din template-uri), iar static/dist/sw.js e service worker-ul cu lista de precache completata.
+Fisierele din build-urile vechi raman, paginile deja deschise le mai pot cere dupa un deploy.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+
+import config
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_NAME = 'assets.json'
+# Service worker-ul are adresa fixa (/sw.js), nu primeste hash
+SERVICE_WORKER = 'sw.js'
+COMPRESSIBLE = ('.css', '.js', '.json', '.svg')
+
+# Shell-ul paginilor studentilor: template-urile si fisierele lor, tinute in cache de service worker
+SHELL_PAGES = ['/scan', '/verify/qr/shell']
+SHELL_TEMPLATES = ['scan.html', 'verify_qr.html']
+SHELL_ASSETS = ['css/scan.css', 'js/scan.js', 'css/verify_qr.css', 'js/verify_qr.js', 'js/sw-register.js', 'favicon.png']
+# Valorile din config scrise in shell (atribute data-* pe /scan)
+SHELL_SETTINGS = ['QR_TOKEN_BUFFER_SECONDS', 'TOKEN_VALIDITY_SECONDS']
+
+
+def hashed_name(path, data):
+    # css/scan.css -> css/scan.<10 hex>.css
+    stem, ext = os.path.splitext(path)
+    return f'{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}'
+
+
+def write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    if path.endswith(COMPRESSIBLE):
+        # mtime=0: acelasi continut -> acelasi .gz
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+
+
+def source_files():
+    # Caile relative (cu /) ale fisierelor sursa, fara dist/ si fara service worker
+    for root, dirs, files in os.walk(STATIC_DIR):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != DIST_DIR)
+        for name in sorted(files):
+            path = os.path.relpath(os.path.join(root, name), STATIC_DIR).replace(os.sep, '/')
+            if path != SERVICE_WORKER:
+                yield path
+
+
+def build_service_worker(manifest):
+    # Versiunea se schimba odata cu oricare fisier, template sau setare din shell -> telefoanele iau shell-ul nou
+    version = hashlib.sha256()
+    version.update(json.dumps([getattr(config, name) for name in SHELL_SETTINGS]).encode())
+    for template in SHELL_TEMPLATES:
+        with open(os.path.join(BASE_DIR, 'templates', template), 'rb') as f:
+            version.update(f.read())
+    for asset in SHELL_ASSETS:
+        version.update(manifest[asset].encode())
+    precache = SHELL_PAGES + [f'/static/dist/{manifest[asset]}' for asset in SHELL_ASSETS]
+
+    with open(os.path.join(STATIC_DIR, SERVICE_WORKER)) as f:
+        source = f.read()
+    source, found_version = re.subn(r"^const VERSION = .*;$", f"const VERSION = '{version.hexdigest()[:10]}';", source, flags=re.M)
+    source, found_precache = re.subn(r"^const PRECACHE = .*;$", f"const PRECACHE = {json.dumps(precache)};", source, flags=re.M)
+    if not (found_version and found_precache):
+        raise ValueError(f'{SERVICE_WORKER}: lipsesc liniile VERSION/PRECACHE')
+    write_file(os.path.join(DIST_DIR, SERVICE_WORKER), source.encode())
+    return version.hexdigest()[:10]
+
+
+def build():
+    manifest = {}
+    for path in source_files():
+        with open(os.path.join(STATIC_DIR, path), 'rb') as f:
+            data = f.read()
+        manifest[path] = hashed_name(path, data)
+        write_file(os.path.join(DIST_DIR, manifest[path]), data)
+
+    missing = [asset for asset in SHELL_ASSETS if asset not in manifest]
+    if missing:
+        print(f"Lipsesc fisierele din shell: {', '.join(missing)}")
+        return False
+    version = build_service_worker(manifest)
+
+    with open(os.path.join(DIST_DIR, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    print(f'{len(manifest)} fisiere in {os.path.relpath(DIST_DIR, BASE_DIR)}/, service worker {version}')
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if build() else 1)
@@ -11,13 +11,51 @@ DEBUG = os.environ.get('DEBUG', 'True').lower() == 'true'
 # Fisierer
 DATA_DIR = 'data'
 DATABASE_DIR = 'Database'
-DATABASE_FILE = os.path.join(DATA_DIR, 'attendance.db')
+# ATTENDANCE_DB=':memory:' = baza in RAM (teste, benchmark-uri)
+DATABASE_FILE = os.environ.get('ATTENDANCE_DB', os.path.join(DATA_DIR, 'attendance.db'))
+# Semestrele inchise, mutate din baza live de archive.py (cate un fisier SQLite pe semestru)
+ARCHIVE_DIR = os.path.join(DATA_DIR, 'archive')
+
+# Conexiuni SQLite (se refolosesc intre cereri, vezi database.py)
+DB_POOL_SIZE = 8  # Cate conexiuni libere se tin deschise per worker
+DB_BUSY_TIMEOUT_MS = 5000  # Cat asteapta un writer dupa lock inainte de 'database is locked'
+DB_CACHE_SIZE_KB = 16384  # Page cache per conexiune (16 MB)
+DB_MMAP_SIZE = 64 * 1024 * 1024  # 64 MB mmap pentru citiri
+
+# Group commit pentru prezente: prezentele acceptate se scriu in loturi, un singur fsync per lot
+# Ajuta doar cand un worker are mai multe cereri simultan (gunicorn --threads / gthread)
+ATTENDANCE_GROUP_COMMIT = os.environ.get('ATTENDANCE_GROUP_COMMIT', 'False').lower() == 'true'
+ATTENDANCE_BATCH_MAX = 64  # Cate prezente intr-un lot, maxim
+ATTENDANCE_BATCH_WAIT_MS = 5  # Cat asteapta primul din lot dupa altii
+ATTENDANCE_BATCH_TIMEOUT_SECONDS = 10  # Cat asteapta o cerere dupa lotul ei; peste, o scrie direct
 
 
 TOKEN_VALIDITY_SECONDS = 10  # Fiecare Qr code este valid pentru 10 secunde
 QR_TOKEN_BUFFER_SECONDS = 7  # Buffer mai mult pentru validarea QR tokenului
+# 'table' - tokenul QR e random si se salveaza in tabela qr_tokens
+# 'signed' - tokenul QR contine lectia, clasa si ora, semnate HMAC cu SECRET_KEY (fara citiri/scrieri in baza de date)
+QR_TOKEN_MODE = os.environ.get('QR_TOKEN_MODE', 'table')
 SESSION_DURATION_SECONDS = 40  # Durata totala a sesiunii: 4 Qr code x 10 secunde
 DEVICE_REREGISTER_COOLDOWN_SECONDS = 120  # 2 minute de asteptare dupa marcarea prezentei
+COOLDOWN_CACHE_SLOTS = 65536  # Sloturi in cache-ul de cooldown-uri comun workerilor (32 bytes fiecare, ~2 MB)
+ATTENDANCE_PAGE_SIZE = 100  # Cate randuri pe pagina in /admin/attendance
+MAINTENANCE_INTERVAL_SECONDS = 30  # La cat timp se sterg tokenurile si cooldown-urile expirate
+
+# Controlul admiterii pentru /api/verify-attendance si /register (admission.py), inainte de baza de date
+RATE_LIMIT_DEVICE_PER_SECOND = 0.5  # Un telefon: o incercare la 2 secunde pe termen lung...
+RATE_LIMIT_DEVICE_BURST = 5  # ...dar 5 deodata sunt in regula (retry pe Wi-Fi slab)
+# Toata universitatea iese pe internet prin cateva IP-uri (NAT), deci limita pe IP e pentru o sala plina
+RATE_LIMIT_IP_PER_SECOND = 100
+RATE_LIMIT_IP_BURST = 1000
+RATE_LIMIT_CACHE_SLOTS = 65536  # Sloturi in cache-ul comun al limitatorului (32 bytes fiecare, ~2 MB)
+MAX_IN_FLIGHT_REQUESTS = 32  # Cereri in lucru pe aceste endpoint-uri, in total pe toti workerii; peste -> 503
+
+# Raspunsuri idempotente pentru /api/verify-attendance (header Idempotency-Key, vezi idempotency.py)
+IDEMPOTENCY_TTL_SECONDS = 120  # Cat se tine raspunsul pentru repetari
+IDEMPOTENCY_PENDING_SECONDS = 15  # Cat poate sta rezervata cheia unei cereri care nu s-a terminat
+IDEMPOTENCY_WAIT_SECONDS = 5  # Cat asteapta o repetare dupa cererea originala aflata inca in lucru
+IDEMPOTENCY_CACHE_SLOTS = 8192
+IDEMPOTENCY_MAX_BODY = 512  # Raspunsurile mai lungi nu se tin (slot de ~540 bytes, ~4.4 MB in total)
 
 
 # Ip prefixe publice permise pentru marcarea prezentei
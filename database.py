@@ -5,123 +5,235 @@ Un Modul pentru aplicatia principala cu toate functiile, aici e asa un futai
 import sqlite3
 import os
 import hashlib
-from contextlib import contextmanager
+import itertools
+import queue
+import threading
+import time
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
+from urllib.parse import quote
 import config
+from shared_cache import SharedTTLCache
 
 
-DATABASE_PATH = os.path.join(config.DATA_DIR, 'attendance.db')
+MEMORY_DATABASE = ':memory:'
+_memory_ids = itertools.count(1)
+
+def _file_uri(path, **params):
+    query = '&'.join(f'{key}={value}' for key, value in params.items())
+    return 'file:' + quote(os.path.abspath(path)) + (f'?{query}' if query else '')
 
 def _hash_password(password):
     """Hash a password using SHA256."""
     return hashlib.sha256(password.encode()).hexdigest()
 
+class DatabaseEngine:
+    # Unde sta baza de date si cum se deschid conexiunile catre ea
+    # path poate fi un fisier sau ':memory:' (baza in RAM, partajata intre conexiuni prin shared cache,
+    # pentru teste si benchmark-uri). Nu se face nimic pe disc pana la prima conexiune.
+
+    def __init__(self, path, pool_size=None):
+        self.path = path
+        self.in_memory = path == MEMORY_DATABASE
+        # Fiecare engine in memorie are baza lui, cu nume unic
+        self._uri = f'file:attendance-memory-{next(_memory_ids)}?mode=memory&cache=shared' if self.in_memory else None
+        self._keepalive = None
+        # In shared cache lock-urile sunt pe tabel si nu asteapta busy_timeout ('database table is locked'),
+        # asa ca pentru baza in memorie accesul se serializeaza in proces
+        self._serial = threading.RLock() if self.in_memory else None
+        self.initialized = False
+        self._init_lock = threading.Lock()
+        self.pool = ConnectionPool(pool_size or config.DB_POOL_SIZE, self.connect)
+        # Cache-ul de cooldown-uri (SharedTTLCache), deschis la prima folosire, vezi _cooldown_cache()
+        self.cooldowns = None
+
+    def connect(self):
+        # O conexiune noua, cu toate PRAGMA-urile setate o singura data
+        if self.in_memory:
+            conn = sqlite3.connect(self._uri, uri=True, timeout=config.DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+            if self._keepalive is None:
+                # Baza in memorie dispare cand se inchide ultima conexiune, asa ca tinem una deschisa
+                self._keepalive = conn
+                conn = sqlite3.connect(self._uri, uri=True, timeout=config.DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        else:
+            # Deschisa ca URI, ca ATTACH sa inteleaga si el URI-uri (arhivele se ataseaza cu mode=ro)
+            conn = sqlite3.connect(_file_uri(self.path), uri=True, timeout=config.DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        # Ca INSERT OR REPLACE sa declanseze si triggerele de DELETE (contoarele din stats_counters)
+        conn.execute("PRAGMA recursive_triggers = ON")
+        conn.execute(f"PRAGMA busy_timeout = {int(config.DB_BUSY_TIMEOUT_MS)}")
+        conn.execute(f"PRAGMA cache_size = -{int(config.DB_CACHE_SIZE_KB)}")
+        if not self.in_memory:
+            # WAL si mmap au sens doar pentru fisiere
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(f"PRAGMA mmap_size = {int(config.DB_MMAP_SIZE)}")
+        return conn
+
+    def serialized(self):
+        return self._serial if self._serial is not None else nullcontext()
+
+    def after_fork(self):
+        # In procesul copil (gunicorn --preload): conexiunile parintelui nu se folosesc si nu se inchid
+        # (sqlite3_close ar putea atinge WAL-ul parintelui), doar se abandoneaza si copilul isi deschide altele
+        _inherited_connections.extend(self.pool.abandon())
+        self._serial = threading.RLock() if self.in_memory else None
+        self._init_lock = threading.Lock()
+
+    def close(self):
+        self.pool.close_all()
+        if self.cooldowns is not None:
+            self.cooldowns.close()
+            self.cooldowns = None
+        if self._keepalive is not None:
+            self._keepalive.close()
+            self._keepalive = None
+
+
+class ConnectionPool:
+    # Pool de conexiuni refolosite intre cereri, ca sa nu deschidem cate una la fiecare helper
+    # Conexiunile libere stau intr-o coada LIFO (cea mai calda se refoloseste prima)
+
+    def __init__(self, size, connect):
+        self.size = size
+        self._connect = connect
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def abandon(self):
+        # Se golesc conexiunile libere fara sa fie inchise (dupa fork), coada e noua
+        idle = self._idle
+        self._idle = queue.LifoQueue(maxsize=self.size)
+        abandoned = []
+        while True:
+            try:
+                abandoned.append(idle.get_nowait())
+            except queue.Empty:
+                return abandoned
+
+
+_engine = None
+_engine_lock = threading.Lock()
+# Conexiuni mostenite de la parinte dupa fork; tinem referinta ca sa nu le inchida garbage collector-ul
+_inherited_connections = []
+
+def configure_database(path=None, pool_size=None):
+    # Se alege baza de date folosita de toate functiile db_* (fisier sau ':memory:')
+    # Fara argumente se foloseste config.DATABASE_FILE. Schema NU se creeaza aici, vezi init_database()
+    global _engine, _attendance_batcher
+    with _engine_lock:
+        if _engine is not None:
+            _engine.close()
+        _engine = DatabaseEngine(path or config.DATABASE_FILE, pool_size)
+        # Thread-ul de scriere in lot tine o conexiune la vechea baza: se opreste, cel nou porneste la prima prezenta
+        _attendance_batcher.close()
+        _attendance_batcher = AttendanceBatcher(
+            config.ATTENDANCE_BATCH_MAX, config.ATTENDANCE_BATCH_WAIT_MS, config.ATTENDANCE_BATCH_TIMEOUT_SECONDS
+        )
+    return _engine
+
+def get_engine():
+    # Engine-ul curent; daca nu s-a apelat configure_database() se foloseste config.DATABASE_FILE
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = DatabaseEngine(config.DATABASE_FILE)
+    return _engine
+
+def _before_fork():
+    # Parintele (masterul gunicorn cu --preload) inchide conexiunile libere inainte de fork,
+    # ca sa nu ajunga in workeri
+    if _engine is not None:
+        _engine.pool.close_all()
+
+def _after_fork_in_child():
+    global _engine_lock
+    _engine_lock = threading.Lock()
+    if _engine is not None:
+        _engine.after_fork()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(before=_before_fork, after_in_child=_after_fork_in_child)
+
 def get_db_connection():
-    # Se face conexiunea la baza de date
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
+    # O conexiune noua (nu din pool) la baza de date curenta
+    return get_engine().connect()
+
+def db_sidecar_path(suffix):
+    # Fisierul <baza>-<suffix> langa baza curenta (ca -wal si -shm), pentru starea comuna a workerilor:
+    # un server pe alta baza (benchmark, teste) nu o imparte cu productia; None pentru ':memory:'
+    engine = get_engine()
+    return None if engine.in_memory else f'{engine.path}-{suffix}'
 
 @contextmanager
 def db_connection():
-    # Se gestioneaza conexiunea la baza de date, BLEAAAA
-    conn = get_db_connection()
-    try:
-        yield conn
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        conn.close()
+    # Se imprumuta o conexiune din pool si se da inapoi la sfarsit, BLEAAAA
+    engine = get_engine()
+    with engine.serialized():
+        conn = engine.pool.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            engine.pool.release(conn)
 
 def init_database():
-    # Se initializeaza baza de date cu toate tabelele.
-    # Verificam daca baza de date exista inainte de initializare
-    is_new_database = not os.path.exists(DATABASE_PATH)
-    
+    # Se initializeaza baza de date: se ruleaza migrarile care lipsesc (dupa PRAGMA user_version)
+    # Se apeleaza explicit (app.py la pornire, scripturile, testele) si ruleaza o singura data per engine;
+    # cand schema e la zi costa un singur PRAGMA, fara nici un DDL
+    engine = get_engine()
+    with engine._init_lock:
+        if engine.initialized:
+            return
+        migrate_database()
+        engine.initialized = True
+
+def schema_version():
+    # Versiunea schemei din fisier (0 = baza veche, dinainte de migrari, sau baza noua)
+    with db_connection() as conn:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate_database():
+    # Se aplica in ordine migrarile de dupa versiunea curenta, toate intr-o singura tranzactie
+    # Returneaza lista migrarilor aplicate (goala daca schema era deja la zi)
+    if schema_version() >= SCHEMA_VERSION:
+        return []
+    applied = []
     with db_connection() as conn:
         cursor = conn.cursor()
-        
-        # Student table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS students (
-                id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                surname TEXT NOT NULL,
-                group_name TEXT NOT NULL,
-                barcode_hash TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_students_group ON students(group_name)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_students_barcode ON students(barcode_hash)')
-        
-        # Devices table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS devices (
-                student_id TEXT PRIMARY KEY,
-                token_hash TEXT NOT NULL,
-                registered_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                user_agent TEXT,
-                device_type TEXT,
-                FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE
-            )
-        ''')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_devices_token ON devices(token_hash)')
-        
-        # Migrare: adaugam coloanele user_agent si device_type daca nu exista
-        cursor.execute("PRAGMA table_info(devices)")
-        columns = [col[1] for col in cursor.fetchall()]
-        if 'user_agent' not in columns:
-            cursor.execute('ALTER TABLE devices ADD COLUMN user_agent TEXT')
-        if 'device_type' not in columns:
-            cursor.execute('ALTER TABLE devices ADD COLUMN device_type TEXT')
-        
-        # Attendance table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS attendance (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id TEXT NOT NULL,
-                lesson_id TEXT NOT NULL,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE
-            )
-        ''')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_student ON attendance(student_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_lesson ON attendance(lesson_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance(date(timestamp))')
-        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_unique ON attendance(student_id, lesson_id)')
-        
-        # Pentru profesori
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS teachers (
-                username TEXT PRIMARY KEY,
-                password_hash TEXT NOT NULL,
-                display_name TEXT NOT NULL,
-                role TEXT DEFAULT 'teacher',
-                password_changed INTEGER DEFAULT 0
-            )
-        ''')
-        
-        # Cool down la dispozitive
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS device_cooldowns (
-                token_hash TEXT PRIMARY KEY,
-                last_action DATETIME NOT NULL
-            )
-        ''')
-        
-        # QR tokens table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS qr_tokens (
-                token TEXT PRIMARY KEY,
-                lesson_id TEXT NOT NULL,
-                classroom TEXT NOT NULL,
-                created_at REAL NOT NULL
-            )
-        ''')
+        # IMMEDIATE: daca pornesc mai multi workeri deodata, doar unul migreaza, ceilalti asteapta
+        cursor.execute('BEGIN IMMEDIATE')
+        version = cursor.execute('PRAGMA user_version').fetchone()[0]
+        is_new_database = version == 0 and cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'"
+        ).fetchone()[0] == 0
+        for number, migration in enumerate(MIGRATIONS[version:], version + 1):
+            migration(cursor)
+            applied.append(migration.__name__)
+            cursor.execute(f'PRAGMA user_version = {number}')
         
         # Daca baza de date e noua, cream utilizatorul admin default
         if is_new_database:
@@ -136,6 +248,343 @@ def init_database():
                 VALUES (?, ?, ?, ?, ?)
             ''', (default_username, password_hash, default_display_name, default_role, 0))
             print(f"Baza de date noua creata. Utilizator admin default: '{default_username}' cu parola: '{default_password}'")
+    return applied
+
+
+# Migrarile schemei, in ordine; versiunea = pozitia in MIGRATIONS (PRAGMA user_version)
+# Bazele create inainte de migrari au user_version 0, de aceea primele folosesc IF NOT EXISTS
+# O migrare noua se adauga DOAR la sfarsitul listei, cele vechi nu se mai modifica
+
+def _migration_base_schema(cursor):
+    # Student table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS students (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            surname TEXT NOT NULL,
+            group_name TEXT NOT NULL,
+            barcode_hash TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_students_group ON students(group_name)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_students_barcode ON students(barcode_hash)')
+    
+    # Devices table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS devices (
+            student_id TEXT PRIMARY KEY,
+            token_hash TEXT NOT NULL,
+            registered_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            user_agent TEXT,
+            device_type TEXT,
+            FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_devices_token ON devices(token_hash)')
+    
+    # Migrare: adaugam coloanele user_agent si device_type daca nu exista
+    cursor.execute("PRAGMA table_info(devices)")
+    columns = [col[1] for col in cursor.fetchall()]
+    if 'user_agent' not in columns:
+        cursor.execute('ALTER TABLE devices ADD COLUMN user_agent TEXT')
+    if 'device_type' not in columns:
+        cursor.execute('ALTER TABLE devices ADD COLUMN device_type TEXT')
+    
+    # Attendance table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attendance (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id TEXT NOT NULL,
+            lesson_id TEXT NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_student ON attendance(student_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_lesson ON attendance(lesson_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance(date(timestamp))')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_unique ON attendance(student_id, lesson_id)')
+    
+    # Pentru profesori
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS teachers (
+            username TEXT PRIMARY KEY,
+            password_hash TEXT NOT NULL,
+            display_name TEXT NOT NULL,
+            role TEXT DEFAULT 'teacher',
+            password_changed INTEGER DEFAULT 0
+        )
+    ''')
+    
+    # Cool down la dispozitive
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS device_cooldowns (
+            token_hash TEXT PRIMARY KEY,
+            last_action DATETIME NOT NULL
+        )
+    ''')
+    
+    # QR tokens table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS qr_tokens (
+            token TEXT PRIMARY KEY,
+            lesson_id TEXT NOT NULL,
+            classroom TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+    ''')
+
+def _migration_query_indexes(cursor):
+    # Indexuri pentru curatenie si pentru filtrele din /admin/attendance
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_qr_tokens_created ON qr_tokens(created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_lesson_time ON attendance(lesson_id, timestamp)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_timestamp ON attendance(timestamp)')
+
+def _migration_display_codes(cursor):
+    # Coduri scurte (5 cifre) pentru tokenurile QR active, comune pentru toti workerii
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS display_codes (
+            code TEXT PRIMARY KEY,
+            token TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_display_codes_expires ON display_codes(expires_at)')
+
+def _migration_stats_counters(cursor):
+    # Contoare pentru dashboard, tinute la zi de triggere (nu mai numaram tabelele intregi)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    for table in COUNTED_TABLES:
+        # Se numara o singura data, cand contorul nu exista inca
+        cursor.execute(f'''
+            INSERT OR IGNORE INTO stats_counters (name, value)
+            SELECT '{table}', COUNT(*) FROM {table}
+        ''')
+    _create_counter_triggers(cursor)
+
+COUNTED_TABLES = ('students', 'devices', 'attendance')
+
+def _create_counter_triggers(cursor):
+    for table in COUNTED_TABLES:
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_count_insert AFTER INSERT ON {table}
+            BEGIN
+                UPDATE stats_counters SET value = value + 1 WHERE name = '{table}';
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_count_delete AFTER DELETE ON {table}
+            BEGIN
+                UPDATE stats_counters SET value = value - 1 WHERE name = '{table}';
+            END
+        ''')
+
+def _migration_archives(cursor):
+    # Semestrele arhivate: fisierul si intervalul [start_date, end_date) pe care il acopera
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS archives (
+            name TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            rows INTEGER NOT NULL DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def _migration_integer_keys(cursor):
+    # Chei INTEGER (rowid) in loc de hash-ul de 64 de caractere si de textul lectiei repetat pe fiecare rand
+    # students.id (hash-ul) ramane identificatorul extern, unic; lectiile primesc tabelul lor
+    # Tabelele se reconstruiesc (SQLite nu poate schimba cheia primara) si triggerele se refac
+    for table in COUNTED_TABLES:
+        cursor.execute(f'DROP TRIGGER IF EXISTS trg_{table}_count_insert')
+        cursor.execute(f'DROP TRIGGER IF EXISTS trg_{table}_count_delete')
+
+    cursor.execute('''
+        CREATE TABLE students_new (
+            pk INTEGER PRIMARY KEY,
+            id TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL,
+            surname TEXT NOT NULL,
+            group_name TEXT NOT NULL,
+            barcode_hash TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        INSERT INTO students_new (id, name, surname, group_name, barcode_hash, created_at)
+        SELECT id, name, surname, group_name, barcode_hash, created_at FROM students ORDER BY rowid
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS lessons (
+            pk INTEGER PRIMARY KEY,
+            lesson_id TEXT NOT NULL UNIQUE
+        )
+    ''')
+    cursor.execute('''
+        INSERT OR IGNORE INTO lessons (lesson_id)
+        SELECT lesson_id FROM attendance GROUP BY lesson_id ORDER BY MIN(timestamp)
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE attendance_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_pk INTEGER NOT NULL,
+            lesson_pk INTEGER NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (student_pk) REFERENCES students_new(pk) ON DELETE CASCADE,
+            FOREIGN KEY (lesson_pk) REFERENCES lessons(pk)
+        )
+    ''')
+    cursor.execute('''
+        INSERT INTO attendance_new (id, student_pk, lesson_pk, timestamp)
+        SELECT a.id, s.pk, l.pk, a.timestamp
+        FROM attendance a
+        JOIN students_new s ON s.id = a.student_id
+        JOIN lessons l ON l.lesson_id = a.lesson_id
+        ORDER BY a.id
+    ''')
+    # AUTOINCREMENT: id-urile nu se refolosesc niciodata (arhivele pastreaza id-urile originale)
+    cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'attendance_new'")
+    cursor.execute('''
+        INSERT INTO sqlite_sequence (name, seq)
+        SELECT 'attendance_new', max(coalesce((SELECT MAX(seq) FROM sqlite_sequence WHERE name = 'attendance'), 0),
+                                     coalesce((SELECT MAX(id) FROM attendance_new), 0))
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE devices_new (
+            student_pk INTEGER PRIMARY KEY,
+            token_hash TEXT NOT NULL,
+            registered_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            user_agent TEXT,
+            device_type TEXT,
+            FOREIGN KEY (student_pk) REFERENCES students_new(pk) ON DELETE CASCADE
+        )
+    ''')
+    cursor.execute('''
+        INSERT INTO devices_new (student_pk, token_hash, registered_at, user_agent, device_type)
+        SELECT s.pk, d.token_hash, d.registered_at, d.user_agent, d.device_type
+        FROM devices d
+        JOIN students_new s ON s.id = d.student_id
+    ''')
+
+    # Copiii primii, ca DROP-ul lui students sa nu aiba pe cine sa stearga in cascada
+    cursor.execute('DROP TABLE attendance')
+    cursor.execute('DROP TABLE devices')
+    cursor.execute('DROP TABLE students')
+    # RENAME actualizeaza si referintele FOREIGN KEY din attendance_new si devices_new
+    cursor.execute('ALTER TABLE students_new RENAME TO students')
+    cursor.execute('ALTER TABLE attendance_new RENAME TO attendance')
+    cursor.execute('ALTER TABLE devices_new RENAME TO devices')
+
+    cursor.execute('CREATE INDEX idx_students_group ON students(group_name)')
+    cursor.execute('CREATE INDEX idx_students_barcode ON students(barcode_hash)')
+    cursor.execute('CREATE INDEX idx_devices_token ON devices(token_hash)')
+    # (student_pk, lesson_pk) acopera si cautarile dupa student, (lesson_pk, timestamp) pe cele dupa lectie,
+    # deci idx_attendance_student si idx_attendance_lesson nu mai sunt necesare
+    cursor.execute('CREATE UNIQUE INDEX idx_attendance_unique ON attendance(student_pk, lesson_pk)')
+    cursor.execute('CREATE INDEX idx_attendance_lesson_time ON attendance(lesson_pk, timestamp)')
+    # Filtrul pe o zi e un interval pe idx_attendance_timestamp, indexul pe date(timestamp) era in plus
+    cursor.execute('CREATE INDEX idx_attendance_timestamp ON attendance(timestamp)')
+
+    # Randurile orfane (fara student) nu au fost copiate, deci contoarele se recalculeaza
+    for table in COUNTED_TABLES:
+        cursor.execute(f"UPDATE stats_counters SET value = (SELECT COUNT(*) FROM {table}) WHERE name = '{table}'")
+    _create_counter_triggers(cursor)
+
+def _migration_lesson_metadata(cursor):
+    # Lectia devine entitate: sala, profesorul si ora de start se scriu cand porneste sesiunea QR
+    # Pentru lectiile vechi ora de start e prima prezenta, calculata o singura data aici, nu la fiecare listare
+    cursor.execute('ALTER TABLE lessons ADD COLUMN classroom TEXT')
+    cursor.execute('ALTER TABLE lessons ADD COLUMN teacher TEXT')
+    cursor.execute('ALTER TABLE lessons ADD COLUMN started_at DATETIME')
+    # 1 = grupele au fost date de profesor la pornirea sesiunii (db_start_lesson), nu se mai deduc din prezente
+    cursor.execute('ALTER TABLE lessons ADD COLUMN groups_declared INTEGER NOT NULL DEFAULT 0')
+    cursor.execute('''
+        UPDATE lessons SET started_at = (SELECT MIN(timestamp) FROM attendance WHERE lesson_pk = lessons.pk)
+    ''')
+    cursor.execute('CREATE INDEX idx_lessons_started ON lessons(started_at)')
+
+    # Grupele unei lectii (o lectie poate fi la mai multe grupe deodata)
+    cursor.execute('''
+        CREATE TABLE lesson_groups (
+            lesson_pk INTEGER NOT NULL,
+            group_name TEXT NOT NULL,
+            PRIMARY KEY (lesson_pk, group_name),
+            FOREIGN KEY (lesson_pk) REFERENCES lessons(pk) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX idx_lesson_groups_group ON lesson_groups(group_name, lesson_pk)')
+    # Lectiile vechi nu au grupe declarate: se deduc din grupele studentilor prezenti
+    cursor.execute('''
+        INSERT OR IGNORE INTO lesson_groups (lesson_pk, group_name)
+        SELECT DISTINCT a.lesson_pk, s.group_name
+        FROM attendance a
+        JOIN students s ON s.pk = a.student_pk
+        JOIN lessons l ON l.pk = a.lesson_pk
+        WHERE s.group_name != '' AND NOT l.groups_declared
+    ''')
+    # La o lectie fara grupe declarate, grupa fiecarui student prezent se adauga la lectie, daca nu era deja
+    # Cu grupe declarate un student din alta grupa nu muta lectia in lista (si matricea) grupei lui
+    cursor.execute('''
+        CREATE TRIGGER trg_attendance_lesson_group AFTER INSERT ON attendance
+        WHEN NOT (SELECT groups_declared FROM lessons WHERE pk = NEW.lesson_pk)
+        BEGIN
+            INSERT OR IGNORE INTO lesson_groups (lesson_pk, group_name)
+            SELECT NEW.lesson_pk, group_name FROM students WHERE pk = NEW.student_pk AND group_name != '';
+        END
+    ''')
+
+def _migration_epoch_cooldowns(cursor):
+    # last_action devine epoch (REAL) in loc de text local 'YYYY-MM-DD HH:MM:SS', fara strptime la verificare
+    # Textul vechi era ora locala, 'utc' il converteste inainte de strftime('%s')
+    cursor.execute('''
+        CREATE TABLE device_cooldowns_new (
+            token_hash TEXT PRIMARY KEY,
+            last_action REAL NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        INSERT INTO device_cooldowns_new (token_hash, last_action)
+        SELECT token_hash, CAST(strftime('%s', last_action, 'utc') AS REAL)
+        FROM device_cooldowns
+        WHERE strftime('%s', last_action, 'utc') IS NOT NULL
+    ''')
+    cursor.execute('DROP TABLE device_cooldowns')
+    cursor.execute('ALTER TABLE device_cooldowns_new RENAME TO device_cooldowns')
+    # Pentru curatenie (si pentru incarcarea cache-ului): doar cooldown-urile recente
+    cursor.execute('CREATE INDEX idx_device_cooldowns_time ON device_cooldowns(last_action)')
+
+def _migration_group_case(cursor):
+    # Grupele se scriu cu majuscule (app.normalize_group); cele vechi, scrise cum au fost tastate
+    # ('ia1' si 'IA1'), se unifica. students.id nu se schimba, hash-ul folosea deja grupa cu majuscule
+    cursor.execute("UPDATE students SET group_name = upper(trim(group_name)) WHERE group_name != upper(trim(group_name))")
+    cursor.execute('''
+        INSERT OR IGNORE INTO lesson_groups (lesson_pk, group_name)
+        SELECT lesson_pk, upper(trim(group_name)) FROM lesson_groups WHERE group_name != upper(trim(group_name))
+    ''')
+    cursor.execute("DELETE FROM lesson_groups WHERE group_name != upper(trim(group_name))")
+
+MIGRATIONS = [
+    _migration_base_schema,
+    _migration_query_indexes,
+    _migration_display_codes,
+    _migration_stats_counters,
+    _migration_archives,
+    _migration_integer_keys,
+    _migration_lesson_metadata,
+    _migration_epoch_cooldowns,
+    _migration_group_case,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
 
 
 #Operatii pe studenti, dispozitive, prezenta, profesori, cooldown-uri, tokenuri QR
@@ -156,17 +605,126 @@ def db_read_students():
             }
     return students
 
+_UPSERT_STUDENT = '''
+    INSERT INTO students (id, name, surname, group_name, barcode_hash, created_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET name = excluded.name, surname = excluded.surname,
+        group_name = excluded.group_name, barcode_hash = excluded.barcode_hash, created_at = excluded.created_at
+'''
+
 def db_write_student(student_id, name, surname, group, barcode='', timestamp=None):
     # Adauga sau modifica un student
+    # Upsert, nu REPLACE: studentul existent isi pastreaza cheia (pk), deci si device-ul si prezentele
     if timestamp is None:
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_UPSERT_STUDENT, (student_id, name, surname, group, barcode, timestamp))
+
+def db_write_students(rows):
+    # Varianta in bloc: rows = [(student_id, name, surname, group, barcode_hash, timestamp), ...]
+    # O singura tranzactie pentru toate randurile
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(_UPSERT_STUDENT, rows)
+
+def db_register_student(student_row, device_row):
+    # Inregistrarea, o singura tranzactie: studentul nou si device-ul lui (un singur commit)
+    # ON CONFLICT(id) DO NOTHING decide atomic daca studentul e nou, fara SELECT inainte,
+    # deci nu mai exista fereastra intre verificare si insert in care sa intre alta cerere
+    # student_row = (student_id, name, surname, group, barcode_hash, timestamp)
+    # device_row = (token_hash, registered_at, user_agent, device_type)
+    # Returneaza False daca studentul exista deja (si atunci nu se scrie nimic)
     with db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('''
-            INSERT OR REPLACE INTO students (id, name, surname, group_name, barcode_hash, created_at)
+            INSERT INTO students (id, name, surname, group_name, barcode_hash, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO NOTHING
+        ''', student_row)
+        if cursor.rowcount == 0:
+            return False
+        student_pk = cursor.lastrowid
+        # Telefonul poate fi inregistrat doar pe un student, se scoate de la altul daca era acolo
+        cursor.execute('DELETE FROM devices WHERE token_hash = ? AND student_pk != ?', (device_row[0], student_pk))
+        cursor.execute('''
+            INSERT INTO devices (student_pk, token_hash, registered_at, user_agent, device_type)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(student_pk) DO UPDATE SET token_hash = excluded.token_hash,
+                registered_at = excluded.registered_at, user_agent = excluded.user_agent,
+                device_type = excluded.device_type
+        ''', (student_pk, *device_row))
+        return True
+
+def db_read_student(student_id):
+    # Se citeste un singur student dupa cheia primara, None daca nu exista
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT name, surname, group_name, barcode_hash, created_at
+            FROM students WHERE id = ?
+        ''', (student_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        return {
+            'name': row['name'],
+            'surname': row['surname'],
+            'group': row['group_name'],
+            'barcode': row['barcode_hash'] or '',
+            'timestamp': row['created_at'] or ''
+        }
+
+def db_student_exists(student_id):
+    # Se verifica daca exista studentul, dupa cheia primara
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT 1 FROM students WHERE id = ?', (student_id,))
+        return cursor.fetchone() is not None
+
+def db_bulk_insert_students(rows, chunk_size=500):
+    # Import in bloc: rows = [(student_id, name, surname, group, barcode_hash, timestamp), ...]
+    # Totul intr-o singura tranzactie cu un singur executemany
+    # Returneaza setul de student_id care existau deja (si nu au fost atinse)
+    existing = set()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        # IMMEDIATE ca sa nu se strecoare alt writer intre verificare si insert
+        cursor.execute('BEGIN IMMEDIATE')
+        ids = [row[0] for row in rows]
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i:i + chunk_size]
+            cursor.execute(
+                f"SELECT id FROM students WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            )
+            existing.update(row['id'] for row in cursor.fetchall())
+        cursor.executemany('''
+            INSERT OR IGNORE INTO students (id, name, surname, group_name, barcode_hash, created_at)
             VALUES (?, ?, ?, ?, ?, ?)
-        ''', (student_id, name, surname, group, barcode, timestamp))
+        ''', [row for row in rows if row[0] not in existing])
+    return existing
+
+def db_find_student_by_barcode(barcode_hash):
+    # Se gaseste studentul dupa hash-ul codului de bare (idx_students_barcode)
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, name, surname, group_name, barcode_hash, created_at
+            FROM students
+            WHERE barcode_hash = ?
+            LIMIT 1
+        ''', (barcode_hash,))
+        row = cursor.fetchone()
+        if not row:
+            return None, None
+        return row['id'], {
+            'name': row['name'],
+            'surname': row['surname'],
+            'group': row['group_name'],
+            'barcode': row['barcode_hash'] or '',
+            'timestamp': row['created_at'] or ''
+        }
 
 def db_delete_student(student_id):
     # Se sterge un student
@@ -182,7 +740,11 @@ def db_read_devices():
     devices = {}
     with db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT student_id, token_hash, registered_at, user_agent, device_type FROM devices')
+        cursor.execute('''
+            SELECT s.id AS student_id, d.token_hash, d.registered_at, d.user_agent, d.device_type
+            FROM devices d
+            JOIN students s ON s.pk = d.student_pk
+        ''')
         for row in cursor.fetchall():
             devices[row['student_id']] = {
                 'token_hash': row['token_hash'],
@@ -200,27 +762,63 @@ def db_write_device(student_id, token_hash, registered_at=None, user_agent=None,
         registered_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
     with db_connection() as conn:
-        cursor = conn.cursor()
-        # Se sterg toate inregistrarile de device cu acelasi token (alt student cu acelasi telefon)
-        cursor.execute('DELETE FROM devices WHERE token_hash = ? AND student_id != ?', (token_hash, student_id))
-        cursor.execute('''
-            INSERT OR REPLACE INTO devices (student_id, token_hash, registered_at, user_agent, device_type)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (student_id, token_hash, registered_at, user_agent, device_type))
+        _write_devices(conn.cursor(), [(student_id, token_hash, registered_at, user_agent, device_type)])
+
+def db_write_devices(rows):
+    # Varianta in bloc: rows = [(student_id, token_hash, registered_at, user_agent, device_type), ...]
+    # O singura tranzactie pentru toate device-urile
+    with db_connection() as conn:
+        _write_devices(conn.cursor(), rows)
+
+def _write_devices(cursor, rows):
+    # Se sterg toate inregistrarile de device cu acelasi token (alt student cu acelasi telefon)
+    rows = list(rows)
+    cursor.executemany('''
+        DELETE FROM devices
+        WHERE token_hash = ? AND student_pk != (SELECT pk FROM students WHERE id = ?)
+    ''', [(row[1], row[0]) for row in rows])
+    cursor.executemany('''
+        INSERT OR REPLACE INTO devices (student_pk, token_hash, registered_at, user_agent, device_type)
+        SELECT pk, ?, ?, ?, ? FROM students WHERE id = ?
+    ''', [(*row[1:], row[0]) for row in rows])
 
 def db_delete_device(student_id):
     # Se sterge un device
     with db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('DELETE FROM devices WHERE student_id = ?', (student_id,))
+        cursor.execute('DELETE FROM devices WHERE student_pk = (SELECT pk FROM students WHERE id = ?)', (student_id,))
 
 def db_find_student_by_token(token_hash):
     # Se gaseste studentul dupa tokenul device-ului
     with db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT student_id FROM devices WHERE token_hash = ?', (token_hash,))
+        cursor.execute('''
+            SELECT s.id FROM devices d JOIN students s ON s.pk = d.student_pk WHERE d.token_hash = ?
+        ''', (token_hash,))
         row = cursor.fetchone()
-        return row['student_id'] if row else None
+        return row['id'] if row else None
+
+def db_find_student_by_device(token_hash):
+    # Se gaseste studentul complet dupa tokenul device-ului, un singur query pe idx_devices_token
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT s.id, s.name, s.surname, s.group_name, s.barcode_hash, s.created_at
+            FROM devices d
+            JOIN students s ON s.pk = d.student_pk
+            WHERE d.token_hash = ?
+            LIMIT 1
+        ''', (token_hash,))
+        row = cursor.fetchone()
+        if not row:
+            return None, None
+        return row['id'], {
+            'name': row['name'],
+            'surname': row['surname'],
+            'group': row['group_name'],
+            'barcode': row['barcode_hash'] or '',
+            'timestamp': row['created_at'] or ''
+        }
 
 
 # Operatii pe prezenta
@@ -230,7 +828,13 @@ def db_read_attendance():
     attendance = []
     with db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT student_id, lesson_id, timestamp FROM attendance ORDER BY timestamp')
+        cursor.execute('''
+            SELECT s.id AS student_id, l.lesson_id, a.timestamp
+            FROM attendance a
+            JOIN students s ON s.pk = a.student_pk
+            JOIN lessons l ON l.pk = a.lesson_pk
+            ORDER BY a.timestamp
+        ''')
         for row in cursor.fetchall():
             attendance.append({
                 'barcode_hash': row['student_id'],
@@ -239,6 +843,21 @@ def db_read_attendance():
             })
     return attendance
 
+def _lesson_pk(cursor, lesson_id, started_at=None):
+    # Cheia lectiei; o lectie fara sesiune QR (scanner, adaugare manuala) se creeaza la prima folosire
+    cursor.execute('INSERT OR IGNORE INTO lessons (lesson_id, started_at) VALUES (?, ?)', (lesson_id, started_at))
+    cursor.execute('SELECT pk FROM lessons WHERE lesson_id = ?', (lesson_id,))
+    return cursor.fetchone()[0]
+
+def _insert_attendance(cursor, student_id, lesson_id, timestamp):
+    # Se insereaza prezenta dupa cheile externe (hash-ul studentului, textul lectiei)
+    # Returneaza False daca studentul nu exista; duplicatul ridica sqlite3.IntegrityError (idx_attendance_unique)
+    cursor.execute('''
+        INSERT INTO attendance (student_pk, lesson_pk, timestamp)
+        SELECT pk, ?, ? FROM students WHERE id = ?
+    ''', (_lesson_pk(cursor, lesson_id, timestamp), timestamp, student_id))
+    return cursor.rowcount > 0
+
 def db_write_attendance(student_id, lesson_id, timestamp=None):
     # Se adauga prezenta.
     if timestamp is None:
@@ -247,30 +866,516 @@ def db_write_attendance(student_id, lesson_id, timestamp=None):
     with db_connection() as conn:
         cursor = conn.cursor()
         try:
-            cursor.execute('''
-                INSERT INTO attendance (student_id, lesson_id, timestamp)
-                VALUES (?, ?, ?)
-            ''', (student_id, lesson_id, timestamp))
-            return True
+            return _insert_attendance(cursor, student_id, lesson_id, timestamp)
         except sqlite3.IntegrityError:
             # daca sunt duplicate (studentul a fost deja marcat prezent)
             return False
 
+def db_write_attendance_with_cooldown(student_id, lesson_id, token_hash, timestamp=None):
+    # Se scrie prezenta si cooldown-ul device-ului in aceeasi tranzactie
+    # Returneaza False daca prezenta exista deja (idx_attendance_unique), si atunci nu se atinge cooldown-ul
+    last_action = time.time()
+    if timestamp is None:
+        timestamp = datetime.fromtimestamp(last_action).strftime('%Y-%m-%d %H:%M:%S')
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            if not _insert_attendance(cursor, student_id, lesson_id, timestamp):
+                return False
+        except sqlite3.IntegrityError:
+            return False
+        cursor.execute('''
+            INSERT OR REPLACE INTO device_cooldowns (token_hash, last_action)
+            VALUES (?, ?)
+        ''', (token_hash, last_action))
+    _cache_device_cooldowns([(token_hash, last_action)])
+    return True
+
+class _PendingMark:
+    # O prezenta care asteapta sa intre intr-un lot
+    # claimed = a intrat intr-un lot, cancelled = thread-ul nu o mai scrie, o scrie cererea direct
+    __slots__ = ('params', 'result', 'error', 'done', 'claimed', 'cancelled')
+
+    def __init__(self, params):
+        self.params = params
+        self.result = False
+        self.error = None
+        self.done = threading.Event()
+        self.claimed = False
+        self.cancelled = False
+
+
+# Pus in coada de AttendanceBatcher.close(): thread-ul de scriere se opreste
+_STOP_WRITER = object()
+
+
+class AttendanceBatcher:
+    # Write-behind pentru prezente: cererile pun prezenta in coada si asteapta,
+    # un thread le scrie pe toate din lot intr-o singura tranzactie (un singur fsync)
+    # Cererea primeste raspunsul doar dupa ce lotul ei e commit-uit
+    # Daca thread-ul nu ajunge la ea in `timeout` secunde (a murit, s-a oprit, baza e blocata),
+    # cererea o scrie direct, ca sa nu ramana agatata (si cu slotul de admitere ocupat)
+
+    def __init__(self, max_batch, max_wait_ms, timeout):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+
+    def submit(self, student_id, lesson_id, token_hash, timestamp, last_action):
+        item = _PendingMark((student_id, lesson_id, token_hash, timestamp, last_action))
+        self._ensure_started().put(item)
+        if not item.done.wait(self.timeout):
+            with self._lock:
+                item.cancelled = not item.claimed
+            # Deja intr-un lot: commit-ul e pe drum (busy_timeout il limiteaza), se mai asteapta o data
+            if not item.cancelled and not item.done.wait(self.timeout):
+                raise TimeoutError('Lotul de prezente nu s-a scris la timp')
+        if item.cancelled:
+            return db_write_attendance_with_cooldown(student_id, lesson_id, token_hash, timestamp)
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def _ensure_started(self):
+        # Thread-ul nu supravietuieste fork-ului, asa ca fiecare proces isi porneste al lui;
+        # se reporneste si daca a murit (de ex. nu s-a putut conecta la baza)
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            with self._lock:
+                if self._pid != os.getpid() or not self._thread.is_alive():
+                    self._queue = queue.Queue()
+                    self._thread = threading.Thread(target=self._run, args=(self._queue, get_engine()),
+                                                    name='attendance-writer', daemon=True)
+                    self._thread.start()
+                    self._pid = os.getpid()
+        return self._queue
+
+    def close(self):
+        # Se opreste thread-ul (configure_database schimba baza): ce e deja in coada se scrie, apoi iese
+        with self._lock:
+            if self._pid == os.getpid() and self._queue is not None:
+                self._queue.put(_STOP_WRITER)
+            self._pid = None
+            self._queue = None
+            self._thread = None
+
+    def _claim(self, batch):
+        # Prezentele pe care cererea a renuntat sa le astepte nu se mai scriu din lot
+        with self._lock:
+            batch = [item for item in batch if not item.cancelled]
+            for item in batch:
+                item.claimed = True
+        return batch
+
+    def _run(self, pending, engine):
+        conn = None
+        batch = []
+        try:
+            conn = engine.connect()
+            # Lotul trebuie sa fie durabil cand raspundem, deci fsync la fiecare commit (unul per lot)
+            conn.execute("PRAGMA synchronous = FULL")
+            while True:
+                batch = [pending.get()]
+                stop = batch[0] is _STOP_WRITER
+                deadline = time.monotonic() + self.max_wait
+                while not stop and len(batch) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(pending.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                    stop = batch[-1] is _STOP_WRITER
+                batch = self._claim([item for item in batch if item is not _STOP_WRITER])
+                if batch:
+                    with engine.serialized():
+                        self._flush(conn, batch)
+                if stop:
+                    return
+        finally:
+            # Thread-ul iese (close() sau o eroare): ce n-a apucat sa scrie se scrie direct din cereri
+            leftover = [item for item in batch if item is not _STOP_WRITER and not item.done.is_set()]
+            while True:
+                try:
+                    item = pending.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP_WRITER:
+                    leftover.append(item)
+            for item in leftover:
+                item.cancelled = True
+                item.done.set()
+            if conn is not None:
+                conn.close()
+
+    def _flush(self, conn, batch):
+        try:
+            cursor = conn.cursor()
+            cooldowns = []
+            for item in batch:
+                student_id, lesson_id, token_hash, timestamp, last_action = item.params
+                try:
+                    if not _insert_attendance(cursor, student_id, lesson_id, timestamp):
+                        continue
+                except sqlite3.IntegrityError:
+                    # Duplicat (idx_attendance_unique), se anuleaza doar instructiunea asta, nu tot lotul
+                    continue
+                cursor.execute('''
+                    INSERT OR REPLACE INTO device_cooldowns (token_hash, last_action)
+                    VALUES (?, ?)
+                ''', (token_hash, last_action))
+                cooldowns.append((token_hash, last_action))
+                item.result = True
+            conn.commit()
+            _cache_device_cooldowns(cooldowns)
+        except Exception as e:
+            conn.rollback()
+            for item in batch:
+                item.result = False
+                item.error = e
+        finally:
+            for item in batch:
+                item.done.set()
+
+
+_attendance_batcher = AttendanceBatcher(
+    config.ATTENDANCE_BATCH_MAX, config.ATTENDANCE_BATCH_WAIT_MS, config.ATTENDANCE_BATCH_TIMEOUT_SECONDS
+)
+
+def db_submit_attendance_with_cooldown(student_id, lesson_id, token_hash, timestamp=None):
+    # Ca db_write_attendance_with_cooldown, dar prin group commit daca e activat in config
+    if not config.ATTENDANCE_GROUP_COMMIT:
+        return db_write_attendance_with_cooldown(student_id, lesson_id, token_hash, timestamp)
+    last_action = time.time()
+    if timestamp is None:
+        timestamp = datetime.fromtimestamp(last_action).strftime('%Y-%m-%d %H:%M:%S')
+    return _attendance_batcher.submit(student_id, lesson_id, token_hash, timestamp, last_action)
+
 def db_check_attendance_exists(student_id, lesson_id):
     # Se verifica daca prezenta exista deja
     with db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('''
-            SELECT 1 FROM attendance WHERE student_id = ? AND lesson_id = ?
+            SELECT 1 FROM attendance a
+            JOIN students s ON s.pk = a.student_pk
+            JOIN lessons l ON l.pk = a.lesson_pk
+            WHERE s.id = ? AND l.lesson_id = ?
         ''', (student_id, lesson_id))
         return cursor.fetchone() is not None
 
+def db_start_lesson(lesson_id, classroom, teacher, groups=(), started_at=None):
+    # Se inregistreaza lectia cand porneste sesiunea QR; o sesiune noua pe aceeasi lectie
+    # actualizeaza sala si profesorul, ora de start ramane prima
+    # Grupele date aici sunt ale lectiei; fara ele se deduc din grupele studentilor prezenti (trigger)
+    if started_at is None:
+        started_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO lessons (lesson_id, classroom, teacher, started_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(lesson_id) DO UPDATE SET
+                classroom = excluded.classroom,
+                teacher = excluded.teacher,
+                started_at = coalesce(lessons.started_at, excluded.started_at)
+        ''', (lesson_id, classroom, teacher, started_at))
+        cursor.execute('SELECT pk, groups_declared FROM lessons WHERE lesson_id = ?', (lesson_id,))
+        lesson_pk, declared = cursor.fetchone()
+        groups = [group for group in groups if group]
+        if not groups:
+            return
+        if not declared:
+            # Grupele deduse din prezentele de pana acum se inlocuiesc cu cele declarate
+            cursor.execute('DELETE FROM lesson_groups WHERE lesson_pk = ?', (lesson_pk,))
+            cursor.execute('UPDATE lessons SET groups_declared = 1 WHERE pk = ?', (lesson_pk,))
+        cursor.executemany('INSERT OR IGNORE INTO lesson_groups (lesson_pk, group_name) VALUES (?, ?)',
+                           [(lesson_pk, group) for group in groups])
+
+def db_list_lessons(group=None):
+    # Lectiile, cele mai noi primele, din idx_lessons_started (si idx_lesson_groups_group pentru o grupa)
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        if group:
+            cursor.execute('''
+                SELECT l.lesson_id FROM lessons l
+                JOIN lesson_groups g ON g.lesson_pk = l.pk
+                WHERE g.group_name = ?
+                ORDER BY l.started_at DESC
+            ''', (group,))
+        else:
+            cursor.execute('SELECT lesson_id FROM lessons ORDER BY started_at DESC')
+        return [row['lesson_id'] for row in cursor.fetchall()]
+
+def db_lessons_between(date_from, date_to):
+    # Lectiile pornite in [date_from, date_to), cu metadatele si numarul de prezenti
+    # Intervalul vine din idx_lessons_started, numaratoarea din idx_attendance_lesson_time
+    # (si din idx_archive_lesson pentru lectiile ale caror prezente au fost arhivate)
+    with db_report_connection(date_from, date_to) as (conn, schemas):
+        present = ' + '.join(
+            '(SELECT COUNT(*) FROM main.attendance WHERE lesson_pk = l.pk)' if schema == 'main'
+            else f'(SELECT COUNT(*) FROM {schema}.attendance WHERE lesson_id = l.lesson_id)'
+            for schema in schemas
+        )
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT l.lesson_id, l.classroom, l.teacher, l.started_at,
+                   (SELECT group_concat(group_name, ', ') FROM lesson_groups WHERE lesson_pk = l.pk) AS groups,
+                   {present} AS present
+            FROM lessons l
+            WHERE l.started_at >= ? AND l.started_at < ?
+            ORDER BY l.started_at DESC
+        ''', (date_from, date_to))
+        return [{
+            'lesson_id': row['lesson_id'],
+            'classroom': row['classroom'] or '',
+            'teacher': row['teacher'] or '',
+            'started_at': row['started_at'],
+            'groups': row['groups'] or '',
+            'present': row['present']
+        } for row in cursor.fetchall()]
+
+def db_list_groups():
+    # Grupele distincte, din idx_students_group
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT DISTINCT group_name FROM students WHERE group_name != '' ORDER BY group_name")
+        return [row['group_name'] for row in cursor.fetchall()]
+
+def db_read_group_roster(group, lesson_id, date=None):
+    # Toti studentii din grupa cu prezenta lor la lectie (sau fara), un singur LEFT JOIN
+    # Daca data (sau, fara data, ziua lectiei) cade intr-un semestru arhivat, prezentele se cauta si in arhiva respectiva
+    date_condition = "AND a.timestamp >= ? AND a.timestamp < date(?, '+1 day')" if date else ''
+    params = [lesson_id] + ([date, date] if date else []) + [group]
+    with db_report_connection(date, date, lesson_id) as (conn, schemas):
+        if len(schemas) > 1:
+            # Arhivele au chei text, se compara dupa hash-ul studentului si textul lectiei
+            attendance = ' UNION ALL '.join(_attendance_keys_select(schema) for schema in schemas)
+            join = f'LEFT JOIN ({attendance}) a ON a.student_id = s.id AND a.lesson_id = ? {date_condition}'
+        else:
+            join = f'''LEFT JOIN attendance a
+                ON a.student_pk = s.pk AND a.lesson_pk = (SELECT pk FROM lessons WHERE lesson_id = ?) {date_condition}'''
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT s.id, s.name, s.surname, s.group_name, a.timestamp
+            FROM students s
+            {join}
+            WHERE s.group_name = ?
+            ORDER BY lower(s.surname || ' ' || s.name), s.id
+        ''', params)
+        return [{
+            'student_id': row['id'],
+            'name': row['name'],
+            'surname': row['surname'],
+            'group': row['group_name'],
+            'timestamp': row['timestamp']
+        } for row in cursor.fetchall()]
+
+def db_read_group_students(group):
+    # Studentii grupei (cheia interna, hash-ul si numele), sortati dupa nume, din idx_students_group
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT pk, id, name, surname FROM students
+            WHERE group_name = ?
+            ORDER BY lower(surname || ' ' || name), id
+        ''', (group,))
+        return cursor.fetchall()
+
+def db_read_group_lesson_marks(group, date_from=None, date_to=None):
+    # Lectiile grupei (idx_lesson_groups_group) cu prezentele lor (idx_attendance_lesson_time), un singur query
+    # Randuri (lesson_pk, lesson_id, started_at, student_pk), student_pk e NULL pentru o lectie fara prezente;
+    # prezentele studentilor din alte grupe la aceeasi lectie vin si ele, le ignora cine construieste matricea
+    # Lectiile arhivate raman in `lessons`: prezentele lor se citesc din arhivele care acopera zilele lectiilor,
+    # dupa randurile din baza live, cu cheile traduse inapoi in pk-urile din baza live
+    conditions = ['g.group_name = ?']
+    params = [group]
+    if date_from:
+        conditions.append('l.started_at >= ?')
+        params.append(date_from)
+    if date_to:
+        conditions.append("l.started_at < date(?, '+1 day')")
+        params.append(date_to)
+    where = ' AND '.join(conditions)
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT date(MIN(l.started_at)) AS first, date(MAX(l.started_at)) AS last
+            FROM lesson_groups g
+            JOIN lessons l ON l.pk = g.lesson_pk
+            WHERE {where}
+        ''', params)
+        span = cursor.fetchone()
+    if span['first'] is None:
+        return []
+    with db_report_connection(span['first'], span['last']) as (conn, schemas):
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT l.pk AS lesson_pk, l.lesson_id, l.started_at, a.student_pk
+            FROM lesson_groups g
+            JOIN lessons l ON l.pk = g.lesson_pk
+            LEFT JOIN main.attendance a ON a.lesson_pk = l.pk
+            WHERE {where}
+            ORDER BY l.started_at, l.pk
+        ''', params)
+        rows = cursor.fetchall()
+        for schema in schemas[1:]:
+            # idx_archive_lesson; studentii stersi intre timp nu mai au rand in matrice
+            cursor.execute(f'''
+                SELECT l.pk AS lesson_pk, l.lesson_id, l.started_at, s.pk AS student_pk
+                FROM lesson_groups g
+                JOIN lessons l ON l.pk = g.lesson_pk
+                JOIN {schema}.attendance a ON a.lesson_id = l.lesson_id
+                JOIN main.students s ON s.id = a.student_id
+                WHERE {where}
+            ''', params)
+            rows.extend(cursor.fetchall())
+        return rows
+
+def db_query_attendance(date=None, lesson_id=None, group=None, after=None, limit=100):
+    # Prezentele filtrate in SQL, cu paginare keyset
+    # Cu o lectie aleasa setul e mic (o lectie) si se sorteaza dupa nume; altfel cele mai noi primele,
+    # pe (timestamp, id) din idx_attendance_timestamp, deci fiecare pagina citeste doar `limit` randuri din index
+    # `after` e cursorul (cheie, id) al ultimului rand de pe pagina anterioara
+    # Returneaza (randuri, cursor pentru pagina urmatoare sau None)
+    if lesson_id:
+        sort_key = "lower(coalesce(r.surname, '') || ' ' || coalesce(r.name, 'Unknown'))"
+        order = 'sort_key, r.id'
+        after_condition = f'({sort_key}, r.id) > (?, ?)'
+    else:
+        sort_key = 'r.timestamp'
+        order = 'r.timestamp DESC, r.id DESC'
+        after_condition = '(r.timestamp, r.id) < (?, ?)'
+    where, params = _report_filters(date, lesson_id, group)
+    if after:
+        where += (' AND ' if where else 'WHERE ') + after_condition
+        params.extend(after)
+
+    with db_report_connection(date, date, lesson_id) as (conn, schemas):
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT r.id, r.student_id, r.lesson_id, r.timestamp,
+                   r.name, r.surname, r.group_name, {sort_key} AS sort_key
+            FROM {_attendance_source(schemas)}
+            {where}
+            ORDER BY {order}
+            LIMIT ?
+        ''', params + [limit + 1])
+        rows = cursor.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1]['sort_key'], rows[-1]['id'])
+    return [{
+        'student_id': row['student_id'],
+        'name': row['name'] or 'Unknown',
+        'surname': row['surname'] or '',
+        'group': row['group_name'] or '',
+        'lesson_id': row['lesson_id'],
+        'timestamp': row['timestamp']
+    } for row in rows], next_cursor
+
+def _report_filters(date=None, lesson_id=None, group=None, date_from=None, date_to=None):
+    # Conditiile pentru rapoarte, pe coloanele sursei `r` (vezi _attendance_source)
+    conditions = []
+    params = []
+    if date:
+        # Interval in loc de date(timestamp) = ?, ca sa mearga pe idx_attendance_timestamp
+        conditions.append("r.timestamp >= ? AND r.timestamp < date(?, '+1 day')")
+        params.extend([date, date])
+    if date_from:
+        conditions.append('r.timestamp >= ?')
+        params.append(date_from)
+    if date_to:
+        # date_to e inclusiv, timestamp-urile sunt 'YYYY-MM-DD HH:MM:SS'
+        conditions.append("r.timestamp < date(?, '+1 day')")
+        params.append(date_to)
+    if lesson_id:
+        conditions.append('r.lesson_id = ?')
+        params.append(lesson_id)
+    if group:
+        conditions.append('r.group_name = ?')
+        params.append(group)
+    return ('WHERE ' + ' AND '.join(conditions)) if conditions else '', params
+
+def db_count_attendance_by_group(date=None, lesson_id=None, group=None, date_from=None, date_to=None):
+    # Numarul de prezente pe grupa pentru filtrele exportului (pentru antetele raportului)
+    where, params = _report_filters(date, lesson_id, group, date_from, date_to)
+    with db_report_connection(date or date_from, date or date_to, lesson_id) as (conn, schemas):
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT coalesce(nullif(r.group_name, ''), 'Idee n-am') AS group_name, COUNT(*) AS total
+            FROM {_attendance_source(schemas)}
+            {where}
+            GROUP BY 1
+        ''', params)
+        return {row['group_name']: row['total'] for row in cursor.fetchall()}
+
+def db_iter_attendance_export(date=None, lesson_id=None, group=None, date_from=None, date_to=None, batch_size=1000):
+    # Generator peste prezentele filtrate, sortate dupa grupa, prenume si nume, direct din cursor
+    # Conexiunea ramane imprumutata cat timp se consuma generatorul
+    where, params = _report_filters(date, lesson_id, group, date_from, date_to)
+    with db_report_connection(date or date_from, date or date_to, lesson_id) as (conn, schemas):
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT coalesce(r.name, 'Unknown') AS name, coalesce(r.surname, '') AS surname,
+                   coalesce(r.group_name, '') AS group_name, r.lesson_id, r.timestamp
+            FROM {_attendance_source(schemas)}
+            {where}
+            ORDER BY coalesce(nullif(r.group_name, ''), 'Idee n-am'), lower(r.surname), lower(r.name), r.id
+        ''', params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield {
+                    'name': row['name'],
+                    'surname': row['surname'],
+                    'group': row['group_name'],
+                    'lesson_id': row['lesson_id'],
+                    'timestamp': row['timestamp']
+                }
+
+def db_read_recent_attendance(limit=10):
+    # Ultimele prezente, cele mai noi primele (idx_attendance_timestamp)
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT l.lesson_id, a.timestamp, s.name, s.surname, s.group_name
+            FROM attendance a
+            JOIN students s ON s.pk = a.student_pk
+            JOIN lessons l ON l.pk = a.lesson_pk
+            ORDER BY a.timestamp DESC, a.id DESC
+            LIMIT ?
+        ''', (limit,))
+        return [{
+            'name': row['name'],
+            'surname': row['surname'],
+            'group': row['group_name'],
+            'lesson_id': row['lesson_id'],
+            'timestamp': row['timestamp']
+        } for row in cursor.fetchall()]
+
+def db_read_stats_counters():
+    # Contoarele pentru dashboard: {'students': n, 'devices': n, 'attendance': n}
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT name, value FROM stats_counters')
+        return {row['name']: row['value'] for row in cursor.fetchall()}
+
 def db_delete_attendance(student_id, lesson_id):
     # Se sterge prezenta pentru un student si o lectie
     with db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('''
-            DELETE FROM attendance WHERE student_id = ? AND lesson_id = ?
+            DELETE FROM attendance
+            WHERE student_pk = (SELECT pk FROM students WHERE id = ?)
+              AND lesson_pk = (SELECT pk FROM lessons WHERE lesson_id = ?)
         ''', (student_id, lesson_id))
         return cursor.rowcount > 0
 
@@ -292,6 +1397,31 @@ def db_read_teachers():
             }
     return teachers
 
+def db_read_teacher(username):
+    # Se citeste un singur profesor (login, schimbarea parolei), None daca nu exista
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT password_hash, display_name, role, password_changed
+            FROM teachers WHERE username = ?
+        ''', (username,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        return {
+            'password_hash': row['password_hash'],
+            'display_name': row['display_name'],
+            'role': row['role'],
+            'password_changed': bool(row['password_changed'])
+        }
+
+def db_any_default_password():
+    # Exista vreun profesor care nu si-a schimbat parola default?
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT 1 FROM teachers WHERE password_changed = 0 LIMIT 1')
+        return cursor.fetchone() is not None
+
 def db_write_teacher(username, password_hash, display_name, role='teacher', password_changed=False):
     # Se adauga sau modifica un profesor, asta in caz de facem penteru productie
     with db_connection() as conn:
@@ -301,6 +1431,16 @@ def db_write_teacher(username, password_hash, display_name, role='teacher', pass
             VALUES (?, ?, ?, ?, ?)
         ''', (username, password_hash, display_name, role, 1 if password_changed else 0))
 
+def db_write_teachers(rows):
+    # Varianta in bloc: rows = [(username, password_hash, display_name, role, password_changed), ...]
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO teachers (username, password_hash, display_name, role, password_changed)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(username, password_hash, display_name, role, 1 if password_changed else 0)
+              for username, password_hash, display_name, role, password_changed in rows])
+
 def db_update_teacher_password(username, new_password_hash):
     # Se actualizeaza parola profesorului si se marcheaza ca schimbata
     with db_connection() as conn:
@@ -313,20 +1453,40 @@ def db_update_teacher_password(username, new_password_hash):
 
 # Coolfown-uri la dispozitive
 
-def db_read_device_cooldowns():
-    # Se citesc toate cooldown-urile dispozitivelor
-    cooldowns = {}
+def _cooldown_cache():
+    # Cache-ul de cooldown-uri al bazei curente: fisierul <baza>-cooldowns (langa -wal si -shm),
+    # comun pentru toti workerii, sau o harta anonima pentru ':memory:'
+    # SQLite ramane copia durabila; cand cache-ul e creat gol se incarca din device_cooldowns
+    engine = get_engine()
+    if engine.cooldowns is None:
+        with engine._init_lock:
+            if engine.cooldowns is None:
+                engine.cooldowns = SharedTTLCache(db_sidecar_path('cooldowns'), config.COOLDOWN_CACHE_SLOTS,
+                                                  _recent_device_cooldowns)
+    return engine.cooldowns
+
+def _recent_device_cooldowns():
+    # Cooldown-urile inca active, ca (token_hash, last_action, expira_la), din idx_device_cooldowns_time
+    ttl = config.DEVICE_REREGISTER_COOLDOWN_SECONDS
     with db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT token_hash, last_action FROM device_cooldowns')
-        for row in cursor.fetchall():
-            cooldowns[row['token_hash']] = row['last_action']
-    return cooldowns
+        cursor.execute('SELECT token_hash, last_action FROM device_cooldowns WHERE last_action > ?', (time.time() - ttl,))
+        return [(row['token_hash'], row['last_action'], row['last_action'] + ttl) for row in cursor.fetchall()]
+
+def _cache_device_cooldowns(items):
+    # Write-through: dupa commit, cooldown-urile scrise in SQLite intra si in cache
+    ttl = config.DEVICE_REREGISTER_COOLDOWN_SECONDS
+    _cooldown_cache().set_many((token_hash, last_action, last_action + ttl) for token_hash, last_action in items)
+
+def db_read_device_cooldown(token_hash):
+    # Ultima actiune a device-ului (epoch) daca e inca in cooldown, altfel None
+    # Din cache, un singur lookup, fara SQLite
+    return _cooldown_cache().get(token_hash)
 
 def db_write_device_cooldown(token_hash, last_action=None):
-    # Se adauga sau modifica un cooldown pentru un device
+    # Se adauga sau modifica un cooldown pentru un device (last_action = epoch)
     if last_action is None:
-        last_action = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        last_action = time.time()
     
     with db_connection() as conn:
         cursor = conn.cursor()
@@ -334,15 +1494,24 @@ def db_write_device_cooldown(token_hash, last_action=None):
             INSERT OR REPLACE INTO device_cooldowns (token_hash, last_action)
             VALUES (?, ?)
         ''', (token_hash, last_action))
+    _cache_device_cooldowns([(token_hash, last_action)])
+
+def db_write_device_cooldowns(items):
+    # Varianta in bloc: items = [(token_hash, last_action), ...]
+    items = list(items)
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO device_cooldowns (token_hash, last_action)
+            VALUES (?, ?)
+        ''', items)
+    _cache_device_cooldowns(items)
 
 def db_cleanup_device_cooldowns(cooldown_seconds):
-    # Se sterg cooldown-urile expirate
+    # Se sterg cooldown-urile expirate din SQLite (in cache expira singure)
     with db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('''
-            DELETE FROM device_cooldowns 
-            WHERE datetime(last_action, '+' || ? || ' seconds') < datetime('now')
-        ''', (cooldown_seconds,))
+        cursor.execute('DELETE FROM device_cooldowns WHERE last_action < ?', (time.time() - cooldown_seconds,))
 
 
 # Operatii pe token-urile QR
@@ -361,6 +1530,20 @@ def db_read_qr_tokens():
             }
     return tokens
 
+def db_read_qr_token(token):
+    # Se citeste un singur token QR dupa cheia primara
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT lesson_id, classroom, created_at FROM qr_tokens WHERE token = ?', (token,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        return {
+            'lesson_id': row['lesson_id'],
+            'classroom': row['classroom'],
+            'created_at': row['created_at']
+        }
+
 def db_write_qr_token(token, lesson_id, classroom, created_at):
     # Se adauga sau modifica un token QR
     with db_connection() as conn:
@@ -370,6 +1553,15 @@ def db_write_qr_token(token, lesson_id, classroom, created_at):
             VALUES (?, ?, ?, ?)
         ''', (token, lesson_id, classroom, created_at))
 
+def db_write_qr_tokens(rows):
+    # Varianta in bloc: rows = [(token, lesson_id, classroom, created_at), ...]
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO qr_tokens (token, lesson_id, classroom, created_at)
+            VALUES (?, ?, ?, ?)
+        ''', rows)
+
 def db_delete_qr_token(token):
     # Se sterge un token QR
     with db_connection() as conn:
@@ -378,12 +1570,248 @@ def db_delete_qr_token(token):
 
 def db_cleanup_qr_tokens(validity_seconds):
     # Se sterg token-urile QR expirate
-    import time
     cutoff = time.time() - validity_seconds
     with db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('DELETE FROM qr_tokens WHERE created_at < ?', (cutoff,))
 
 
-# Se intializeza baza de date la importarea modulului ,cat chin a fost AICI
-init_database()
+
+# Coduri scurte pentru tokenurile QR
+
+def db_issue_qr_token(token, expires_at, candidate_codes, token_row=None, now=None):
+    # Emiterea unui token QR intr-o singura tranzactie: tokenul (daca e salvat in tabel,
+    # token_row = (lesson_id, classroom, created_at)) si primul cod scurt liber din candidate_codes
+    # Returneaza codul rezervat sau None daca toate erau ocupate
+    if now is None:
+        now = time.time()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        if token_row is not None:
+            cursor.execute('''
+                INSERT OR REPLACE INTO qr_tokens (token, lesson_id, classroom, created_at)
+                VALUES (?, ?, ?, ?)
+            ''', (token, *token_row))
+        for code in candidate_codes:
+            if _claim_display_code(cursor, code, token, expires_at, now):
+                return code
+    return None
+
+def _claim_display_code(cursor, code, token, expires_at, now):
+    # Se rezerva un cod scurt pentru un token; merge doar daca codul e liber sau expirat
+    # Returneaza False daca codul e folosit de un token inca activ (coliziune)
+    cursor.execute('''
+        INSERT INTO display_codes (code, token, expires_at)
+        VALUES (?, ?, ?)
+        ON CONFLICT(code) DO UPDATE SET token = excluded.token, expires_at = excluded.expires_at
+        WHERE display_codes.expires_at < ?
+    ''', (code, token, expires_at, now))
+    return cursor.rowcount > 0
+
+def db_resolve_display_code(code, now=None):
+    # Se gaseste tokenul pentru un cod scurt, doar daca nu a expirat
+    if now is None:
+        now = time.time()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT token FROM display_codes WHERE code = ? AND expires_at >= ?', (code, now))
+        row = cursor.fetchone()
+        return row['token'] if row else None
+
+def db_cleanup_display_codes(now=None):
+    # Se sterg codurile scurte expirate (idx_display_codes_expires)
+    if now is None:
+        now = time.time()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM display_codes WHERE expires_at < ?', (now,))
+
+
+# Arhivarea pe semestre: prezentele vechi se muta in fisiere separate (config.ARCHIVE_DIR),
+# baza live tine doar semestrul curent. Rapoartele ataseaza read-only arhivele de care au nevoie.
+
+def _create_archive_schema(cursor, schema):
+    # Arhiva e independenta: prezentele cu id-urile originale si instantaneul studentilor lor
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {schema}.attendance (
+            id INTEGER PRIMARY KEY,
+            student_id TEXT NOT NULL,
+            lesson_id TEXT NOT NULL,
+            timestamp DATETIME
+        )
+    ''')
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_archive_lesson ON attendance(lesson_id)')
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_archive_timestamp ON attendance(timestamp)')
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {schema}.students (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            surname TEXT NOT NULL,
+            group_name TEXT NOT NULL
+        )
+    ''')
+
+def db_list_archives():
+    # Semestrele arhivate, cele mai vechi primele
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT name, path, start_date, end_date, rows, created_at FROM archives ORDER BY start_date')
+        return [dict(row) for row in cursor.fetchall()]
+
+def db_archives_for_range(date_from=None, date_to=None):
+    # Arhivele care se suprapun cu intervalul [date_from, date_to] (date 'YYYY-MM-DD', inclusive)
+    conditions = []
+    params = []
+    if date_to:
+        conditions.append('start_date <= ?')
+        params.append(date_to)
+    if date_from:
+        conditions.append('end_date > ?')
+        params.append(date_from)
+    where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT name, path, start_date, end_date FROM archives {where} ORDER BY start_date', params)
+        return [dict(row) for row in cursor.fetchall()]
+
+def _lesson_date(lesson_id):
+    # Ziua in care a pornit lectia ('YYYY-MM-DD') sau None, ca sa se stie in ce semestru cad prezentele ei
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT date(started_at) AS started FROM lessons WHERE lesson_id = ?', (lesson_id,))
+        row = cursor.fetchone()
+        return row['started'] if row else None
+
+@contextmanager
+def db_report_connection(date_from=None, date_to=None, lesson_id=None):
+    # Conexiune pentru rapoarte: (conn, scheme), unde scheme = ['main', 'archive0', ...]
+    # Fara interval, sau cu un interval doar in semestrul curent, nu se ataseaza nimic
+    # si se foloseste o conexiune obisnuita din pool (calea rapida)
+    # Cu o lectie aleasa si fara interval, intervalul e ziua lectiei (lectiile arhivate raman in `lessons`)
+    if lesson_id and not (date_from or date_to):
+        date_from = date_to = _lesson_date(lesson_id)
+    archives = db_archives_for_range(date_from, date_to) if (date_from or date_to) else []
+    if not archives:
+        with db_connection() as conn:
+            yield conn, ['main']
+        return
+    engine = get_engine()
+    with engine.serialized():
+        # Conexiune separata, ca ATTACH-urile sa nu ramana pe conexiunile din pool
+        conn = engine.connect()
+        try:
+            schemas = ['main']
+            for i, archive in enumerate(archives):
+                conn.execute(f'ATTACH DATABASE ? AS archive{i}', (_file_uri(archive['path'], mode='ro'),))
+                schemas.append(f'archive{i}')
+            yield conn, schemas
+        finally:
+            conn.close()
+
+def _attendance_source(schemas):
+    # Prezentele cu studentii lor, ca subquery `r`, din baza live si din arhivele atasate
+    # Pentru baza live singura SQLite aplatizeaza subquery-ul si foloseste indexurile obisnuite
+    selects = []
+    for schema in schemas:
+        if schema == 'main':
+            # Baza live are chei INTEGER, arhivele pastreaza cheile text (sunt independente)
+            selects.append('''
+                SELECT a.id, s.id AS student_id, l.lesson_id, a.timestamp, s.name, s.surname, s.group_name
+                FROM main.attendance a
+                JOIN main.students s ON s.pk = a.student_pk
+                JOIN main.lessons l ON l.pk = a.lesson_pk
+            ''')
+        else:
+            selects.append(f'''
+                SELECT a.id, a.student_id, a.lesson_id, a.timestamp, s.name, s.surname, s.group_name
+                FROM {schema}.attendance a
+                LEFT JOIN {schema}.students s ON s.id = a.student_id
+            ''')
+    return '(' + ' UNION ALL '.join(selects) + ') r'
+
+def _attendance_keys_select(schema):
+    # Prezentele cu cheile externe (student_id = hash, lesson_id = text), pentru UNION cu arhivele
+    if schema == 'main':
+        return '''
+            SELECT s.id AS student_id, l.lesson_id, a.timestamp
+            FROM main.attendance a
+            JOIN main.students s ON s.pk = a.student_pk
+            JOIN main.lessons l ON l.pk = a.lesson_pk
+        '''
+    return f'SELECT student_id, lesson_id, timestamp FROM {schema}.attendance'
+
+def db_archive_attendance(name, before, path):
+    # Se muta prezentele cu timestamp < before ('YYYY-MM-DD') in fisierul arhivei `path`
+    # Returneaza numarul de prezente mutate
+    # Arhiva se scrie si se commit-uie prima; daca procesul moare inainte de stergerea din baza live,
+    # rularea din nou e sigura (INSERT OR IGNORE pe id-urile originale)
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT name, end_date FROM archives ORDER BY end_date DESC LIMIT 1')
+        last = cursor.fetchone()
+        cursor.execute('SELECT 1 FROM archives WHERE name = ?', (name,))
+        if cursor.fetchone():
+            raise ValueError(f"Arhiva '{name}' exista deja")
+        if last and before <= last['end_date']:
+            raise ValueError(f"Data trebuie sa fie dupa sfarsitul arhivei '{last['name']}' ({last['end_date']})")
+        cursor.execute('SELECT date(MIN(timestamp)) AS start_date FROM attendance WHERE timestamp < ?', (before,))
+        start_date = cursor.fetchone()['start_date']
+    if start_date is None:
+        return 0
+    if last:
+        start_date = last['end_date']
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    engine = get_engine()
+    with engine.serialized():
+        conn = engine.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('ATTACH DATABASE ? AS archive', (_file_uri(path),))
+            _create_archive_schema(cursor, 'archive')
+            conn.commit()
+
+            # 1. Copierea in arhiva (prezentele si instantaneul studentilor lor)
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('''
+                INSERT OR IGNORE INTO archive.attendance (id, student_id, lesson_id, timestamp)
+                SELECT a.id, s.id, l.lesson_id, a.timestamp
+                FROM main.attendance a
+                JOIN main.students s ON s.pk = a.student_pk
+                JOIN main.lessons l ON l.pk = a.lesson_pk
+                WHERE a.timestamp < ?
+            ''', (before,))
+            cursor.execute('''
+                INSERT OR REPLACE INTO archive.students (id, name, surname, group_name)
+                SELECT id, name, surname, group_name FROM main.students
+                WHERE pk IN (SELECT DISTINCT student_pk FROM main.attendance WHERE timestamp < ?)
+            ''', (before,))
+            conn.commit()
+
+            # 2. Stergerea din baza live si inregistrarea arhivei
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('DELETE FROM main.attendance WHERE timestamp < ?', (before,))
+            moved = cursor.rowcount
+            cursor.execute('SELECT COUNT(*) FROM archive.attendance')
+            total = cursor.fetchone()[0]
+            cursor.execute('''
+                INSERT INTO main.archives (name, path, start_date, end_date, rows, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (name, path, start_date, before, total, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+            conn.commit()
+            return moved
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+def db_vacuum():
+    # Dupa arhivare fisierul live nu se micsoreaza singur
+    engine = get_engine()
+    with engine.serialized():
+        conn = engine.connect()
+        try:
+            conn.execute('VACUUM')
+        finally:
+            conn.close()
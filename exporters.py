@@ -0,0 +1,190 @@
+"""
+Exportul prezentelor, in streaming: fiecare format e un generator care produce bucati
+pe masura ce vin randurile din cursorul SQL, asa ca memoria ramane constanta.
+Formate: raportul text (.xls vechi), CSV si XLSX adevarat (zip scris din mers).
+"""
+
+import csv
+import io
+import re
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+EXPORT_COLUMNS = ['Grupa', 'Prenume', 'Nume', 'Lectia', 'Timestamp']
+UNKNOWN_GROUP = 'Idee n-am'
+# Cate randuri se aduna inainte sa trimitem o bucata la client
+CHUNK_ROWS = 500
+# Caractere de control care nu sunt permise in XML
+_XML_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _row_values(record):
+    return [record['group'], record['surname'], record['name'], record['lesson_id'], record['timestamp']]
+
+
+def text_report(records, group_counts, date_filter='', lesson_filter='', group_filter=''):
+    # Raportul text grupat pe grupe, acelasi format ca inainte
+    # records trebuie sa vina sortate dupa grupa, prenume si nume; group_counts = {grupa: numar}
+    def pad(text, width):
+        return str(text).ljust(width)
+
+    # Latimi coloane
+    col_num = 5
+    col_name = 20
+    col_surname = 20
+    col_lesson = 20
+    col_timestamp = 22
+
+    # Se adauga BOM pentru UTF-8 la Excel
+    header = ['\ufeff', 'Raport cu prezentele:)\n', f'Generat la :      {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}\n']
+    if date_filter:
+        header.append(f'Data:    {date_filter}\n')
+    if lesson_filter:
+        header.append(f'Lectia:  {lesson_filter}\n')
+    if group_filter:
+        header.append(f'Grupa:   {group_filter}\n')
+    header.append('\n')
+    header.append('Rezumat\n')
+    header.append(f'Toate inregistrarile:  {sum(group_counts.values())}\n')
+    header.append(f'Total Grupi:   {len(group_counts)}\n')
+    header.append('\n')
+    header.append('=' * 90 + '\n')
+    header.append('\n')
+    yield ''.join(header)
+
+    chunk = []
+    current_group = None
+    index = 0
+    for record in records:
+        group = record['group'] or UNKNOWN_GROUP
+        if group != current_group:
+            if current_group is not None:
+                chunk.append('\n')
+            current_group = group
+            index = 0
+            # Antet grupa si antet coloane
+            chunk.append(f'GRUPA: {group}    (Studenti: {group_counts.get(group, 0)})\n')
+            chunk.append('-' * 90 + '\n')
+            chunk.append(f'{pad("#", col_num)}{pad("Prenume", col_surname)}{pad("Nume", col_name)}{pad("Lectia", col_lesson)}{pad("Timestamp", col_timestamp)}\n')
+            chunk.append('-' * 90 + '\n')
+        index += 1
+        chunk.append(f'{pad(index, col_num)}{pad(record["surname"], col_surname)}{pad(record["name"], col_name)}{pad(record["lesson_id"], col_lesson)}{pad(record["timestamp"], col_timestamp)}\n')
+        if len(chunk) >= CHUNK_ROWS:
+            yield ''.join(chunk)
+            chunk = []
+    if current_group is not None:
+        chunk.append('\n')
+    if chunk:
+        yield ''.join(chunk)
+
+
+def csv_report(records, columns=EXPORT_COLUMNS, row_values=_row_values):
+    # CSV cu BOM, ca sa il deschida Excel corect cu diacritice
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(columns)
+    for i, record in enumerate(records, 1):
+        writer.writerow(row_values(record))
+        if i % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+class _ChunkSink:
+    # Fisier doar pentru scriere, fara seek; zipfile scrie atunci cu data descriptors
+    # si noi golim ce s-a scris dupa fiecare bucata de randuri
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_row(row_number, values):
+    cells = []
+    for col, value in enumerate(values):
+        ref = f'{_column_letter(col)}{row_number}'
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+        else:
+            text = escape(_XML_ILLEGAL.sub('', '' if value is None else str(value)))
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{row_number}">{"".join(cells)}</row>'
+
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def xlsx_report(records, sheet_name='Prezenta', columns=EXPORT_COLUMNS, row_values=_row_values):
+    # XLSX adevarat (Office Open XML), o singura foaie cu inline strings, scris direct in zip din mers
+    import zipfile  # doar aici e nevoie de el, nu il incarcam la pornirea workerului
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', _XLSX_CONTENT_TYPES)
+        zf.writestr('_rels/.rels', _XLSX_ROOT_RELS)
+        zf.writestr('xl/_rels/workbook.xml.rels', _XLSX_WORKBOOK_RELS)
+        zf.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+        ))
+        yield sink.drain()
+
+        with zf.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                + _xlsx_row(1, columns)
+            ).encode())
+            rows = []
+            for row_number, record in enumerate(records, 2):
+                rows.append(_xlsx_row(row_number, row_values(record)))
+                if len(rows) >= CHUNK_ROWS:
+                    sheet.write(''.join(rows).encode())
+                    rows = []
+                    yield sink.drain()
+            sheet.write((''.join(rows) + '</sheetData></worksheet>').encode())
+    yield sink.drain()
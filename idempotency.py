@@ -0,0 +1,66 @@
+"""
+Raspunsuri idempotente pentru cererile repetate (retry pe Wi-Fi slab).
+Clientul trimite aceeasi cheie (Idempotency-Key) la fiecare reincercare a aceleiasi cereri; primul
+raspuns se tine putin timp intr-un SharedTTLCache comun workerilor si se da inapoi la repetari,
+fara sa mai treaca prin verificari si prin baza de date.
+"""
+
+import struct
+import time
+
+from shared_cache import SharedTTLCache
+
+# Cererea originala e inca in lucru (cheia e rezervata, raspunsul nu e gata)
+_PENDING = b''
+_STATUS = struct.Struct('<H')
+
+
+class ResponseCache:
+    # Valoarea din cache: codul HTTP (2 bytes) + corpul raspunsului; b'' = in lucru
+    # ttl = cat se tine raspunsul, pending_ttl = cat poate sta o cheie rezervata (cererea a murit pe drum)
+
+    def __init__(self, path, slots, max_body, ttl, pending_ttl):
+        self.cache = SharedTTLCache(path, slots, value_size=_STATUS.size + max_body)
+        self.max_body = max_body
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl
+
+    def _claim(self, value, now):
+        if value is None:
+            return _PENDING, now + self.pending_ttl, ('new', None)
+        if value == _PENDING:
+            return None, None, ('pending', None)
+        return None, None, ('done', self._decode(value))
+
+    @staticmethod
+    def _decode(value):
+        return _STATUS.unpack_from(value)[0], value[_STATUS.size:]
+
+    def begin(self, key):
+        # ('new', None): cererea e prima, se executa si apoi se apeleaza finish()/abandon()
+        # ('pending', None): aceeasi cerere e inca in lucru in alt worker/thread
+        # ('done', (status, body)): raspunsul original
+        return self.cache.update(key, self._claim)
+
+    def wait(self, key, timeout, interval=0.05):
+        # Asteapta raspunsul unei cereri aflate in lucru; None daca nu vine in `timeout` secunde
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            value = self.cache.get(key)
+            if value is None:
+                return None
+            if value != _PENDING:
+                return self._decode(value)
+            time.sleep(interval)
+        return None
+
+    def finish(self, key, status, body):
+        # Se salveaza raspunsul; unul prea mare nu se tine (repetarea trece din nou prin pipeline)
+        if len(body) > self.max_body:
+            self.cache.delete(key)
+            return
+        self.cache.set(key, _STATUS.pack(status) + body, time.time() + self.ttl)
+
+    def abandon(self, key):
+        # Cererea a esuat cu exceptie: cheia se elibereaza, o repetare se executa normal
+        self.cache.delete(key)
@@ -0,0 +1,96 @@
+"""
+Curatenie periodica pentru sistemul de prezenta, in afara cererilor HTTP.
+Tokenurile QR si cooldown-urile expirate se sterg dintr-un thread de fundal,
+iar cererile nu mai fac nici o scriere de mentenanta.
+"""
+
+import os
+import threading
+
+from database import db_sidecar_path
+
+try:
+    import fcntl
+except ImportError:  # Windows, acolo avem oricum un singur proces
+    fcntl = None
+
+
+class MaintenanceScheduler:
+    # Ruleaza joburile la fiecare `interval` secunde intr-un thread daemon
+    # shared_jobs ating baza de date si ruleaza doar in workerul lider (cel care tine lock-ul pe fisier),
+    # local_jobs curata memoria procesului si ruleaza in fiecare worker
+
+    def __init__(self, interval, lock_path, shared_jobs=(), local_jobs=()):
+        self.interval = interval
+        self.lock_path = lock_path
+        self.shared_jobs = list(shared_jobs)
+        self.local_jobs = list(local_jobs)
+        self._lock_file = None
+        self._thread = None
+        self._stop = threading.Event()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork_in_child)
+
+    def start(self):
+        # Porneste thread-ul o singura data per proces
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='maintenance', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def is_leader(self):
+        # Alegerea liderului intre workerii gunicorn: primul care ia flock-ul il tine pana moare,
+        # apoi kernelul elibereaza lock-ul si il ia alt worker la urmatorul tick
+        if fcntl is None or self.lock_path is None:
+            # Fara flock, sau baza ':memory:' (a unui singur proces): procesul e mereu lider
+            return True
+        if self._lock_file is not None:
+            return True
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def run_once(self):
+        if self.is_leader():
+            for job in self.shared_jobs:
+                self._run_job(job)
+        for job in self.local_jobs:
+            self._run_job(job)
+
+    def _after_fork_in_child(self):
+        # Cu gunicorn --preload app-ul (si thread-ul asta) porneste in master; thread-ul nu trece prin fork,
+        # iar flock-ul ramane al masterului (inchiderea copiei noastre de fd nu il elibereaza),
+        # deci masterul ramane lider si workerii ruleaza doar local_jobs
+        was_running = self._thread is not None and not self._stop.is_set()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+        self._thread = None
+        self._stop = threading.Event()
+        if was_running:
+            self.start()
+
+    def _run_job(self, job):
+        try:
+            job()
+        except Exception as e:
+            # Un job picat nu trebuie sa opreasca thread-ul
+            print(f"[MAINTENANCE] {job.__name__} a esuat: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+
+def default_lock_path():
+    # Lock-ul de lider e al bazei curente: un server pe alta baza (de ex. data/bench.db) are liderul lui
+    return db_sidecar_path('maintenance.lock')
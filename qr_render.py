@@ -0,0 +1,82 @@
+"""
+Randarea codurilor QR pentru ecranele profesorilor.
+PNG-ul (PIL + base64) e cel mai scump lucru de pe server, asa ca avem si variante ieftine:
+matricea de module impachetata pe biti (pagina o deseneaza singura pe canvas) si SVG compact.
+Rezultatele se tin intr-un LRU mic, pentru payload-urile care se repeta (QR-ul de inregistrare).
+qrcode (si PIL prin el) se importa abia la prima randare, workerii care nu randeaza nu-l incarca deloc.
+"""
+
+import base64
+import io
+from functools import lru_cache
+
+QR_BOX_SIZE = 10
+QR_BORDER = 5
+RENDER_CACHE_SIZE = 256
+# qrcode incearca toate cele 8 masti si o alege pe cea mai buna, asta e ~80% din timp
+# Pentru QR-urile care se rotesc la 10 secunde fixam masca, codul ramane valid si se scaneaza la fel
+FAST_MASK_PATTERN = 0
+
+
+def _qrcode():
+    # Import lenes, ~30 ms la pornire economisite
+    import qrcode
+    return qrcode
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def _matrix(data, border, mask_pattern=FAST_MASK_PATTERN):
+    qr = _qrcode().QRCode(version=1, box_size=QR_BOX_SIZE, border=border, mask_pattern=mask_pattern)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return tuple(tuple(row) for row in qr.get_matrix())
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def qr_matrix(data, border=QR_BORDER):
+    # Matricea de module, cate un bit per modul (rand dupa rand), in base64
+    # Pentru un token de verificare iese ~300 bytes in loc de ~2 KB de PNG
+    rows = _matrix(data, border)
+    size = len(rows)
+    packed = bytearray((size * size + 7) // 8)
+    bit = 0
+    for row in rows:
+        for dark in row:
+            if dark:
+                packed[bit >> 3] |= 0x80 >> (bit & 7)
+            bit += 1
+    return {'size': size, 'modules': base64.b64encode(bytes(packed)).decode()}
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def qr_svg(data, border=QR_BORDER):
+    # SVG cu un singur path, modulele negre consecutive de pe un rand se unesc intr-un dreptunghi
+    rows = _matrix(data, border)
+    size = len(rows)
+    path = []
+    for y, row in enumerate(rows):
+        x = 0
+        while x < size:
+            if row[x]:
+                start = x
+                while x < size and row[x]:
+                    x += 1
+                path.append(f'M{start} {y}h{x - start}v1h-{x - start}z')
+            else:
+                x += 1
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/><path d="{"".join(path)}"/></svg>'
+    )
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def qr_png_base64(data, border=QR_BORDER, box_size=QR_BOX_SIZE):
+    # PNG-ul clasic, in base64, pentru download si pentru clientii vechi
+    qr = _qrcode().QRCode(version=1, box_size=box_size, border=border)
+    qr.add_data(data)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+    img_io = io.BytesIO()
+    img.save(img_io, 'PNG')
+    return base64.b64encode(img_io.getvalue()).decode()
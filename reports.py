@@ -0,0 +1,91 @@
+"""
+Matricea de prezenta pe semestru: un rand per student din grupa, o coloana per lectie.
+Celulele stau intr-un bytearray (1 = prezent), rand dupa rand, iar totalurile pe randuri si
+coloane se numara cu bytearray.count pe felii, in C, fara bucle Python pe celule.
+"""
+
+from database import db_read_group_students, db_read_group_lesson_marks
+
+PRESENT_MARK = 'P'
+ABSENT_MARK = '-'
+
+
+def _rate(count, total):
+    return round(count / total * 100, 1) if total else 0.0
+
+
+class AttendanceMatrix:
+    # students: [{'student_id', 'name', 'surname'}], lessons: [{'lesson_id', 'started_at'}]
+    # cells: bytearray de len(students) * len(lessons), celula (i, j) e la i * len(lessons) + j
+
+    def __init__(self, group, students, lessons, cells):
+        self.group = group
+        self.students = students
+        self.lessons = lessons
+        self.cells = cells
+
+    def is_present(self, row, col):
+        return self.cells[row * len(self.lessons) + col] == 1
+
+    def row(self, row):
+        # Randul studentului ca bytes, cate un octet 0/1 per lectie
+        width = len(self.lessons)
+        return self.cells[row * width:(row + 1) * width]
+
+    def row_counts(self):
+        # Prezentele fiecarui student
+        width = len(self.lessons)
+        return [self.cells.count(1, i * width, (i + 1) * width) for i in range(len(self.students))]
+
+    def column_counts(self):
+        # Prezentii la fiecare lectie; felia cu pas len(lessons) e coloana j
+        width = len(self.lessons)
+        return [self.cells[j::width].count(1) for j in range(width)]
+
+    def row_rates(self):
+        return [_rate(count, len(self.lessons)) for count in self.row_counts()]
+
+    def column_rates(self):
+        return [_rate(count, len(self.students)) for count in self.column_counts()]
+
+    def overall_rate(self):
+        return _rate(self.cells.count(1), len(self.cells))
+
+    def table_rows(self):
+        # Randurile pentru export: prenume, nume, P/- pe fiecare lectie, prezente, procentaj
+        # si un ultim rand cu procentajul pe fiecare lectie
+        for i, (student, count, rate) in enumerate(zip(self.students, self.row_counts(), self.row_rates())):
+            marks = [PRESENT_MARK if cell else ABSENT_MARK for cell in self.row(i)]
+            yield [student['surname'], student['name'], *marks, count, rate]
+        yield ['Procentaj', '', *self.column_rates(), self.cells.count(1), self.overall_rate()]
+
+    def table_columns(self):
+        return ['Prenume', 'Nume', *[lesson['lesson_id'] for lesson in self.lessons], 'Prezente', 'Procentaj']
+
+
+def build_attendance_matrix(group, date_from=None, date_to=None):
+    # Doua query-uri pe indexuri (studentii grupei, lectiile grupei cu prezentele lor),
+    # apoi fiecare prezenta aprinde o celula
+    students = []
+    student_rows = {}
+    for row in db_read_group_students(group):
+        student_rows[row['pk']] = len(students)
+        students.append({'student_id': row['id'], 'name': row['name'], 'surname': row['surname']})
+
+    lessons = []
+    lesson_cols = {}
+    marks = []
+    for lesson_pk, lesson_id, started_at, student_pk in db_read_group_lesson_marks(group, date_from, date_to):
+        col = lesson_cols.get(lesson_pk)
+        if col is None:
+            col = lesson_cols[lesson_pk] = len(lessons)
+            lessons.append({'lesson_id': lesson_id, 'started_at': started_at})
+        row = student_rows.get(student_pk)
+        if row is not None:
+            marks.append((row, col))
+
+    width = len(lessons)
+    cells = bytearray(len(students) * width)
+    for row, col in marks:
+        cells[row * width + col] = 1
+    return AttendanceMatrix(group, students, lessons, cells)
@@ -12,7 +12,7 @@ import os
 # Se adauga calea curenta pentru a importa modulul database
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from database import db_read_teachers, db_write_teacher
+from database import init_database, db_read_teachers, db_write_teacher
 
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
@@ -39,6 +39,7 @@ def reset_password(username='admin', new_password='admin123'):
     return True
 
 if __name__ == '__main__':
+    init_database()
     if len(sys.argv) == 3:
         # python3 reset_password.py username parola
         reset_password(sys.argv[1], sys.argv[2])
@@ -1 +1,2 @@
-.venv/bin/gunicorn -w 3 -b 127.0.0.1:5000 start:app
+.venv/bin/python build_static.py
+.venv/bin/gunicorn -w 3 -b 127.0.0.1:5000 --preload start:app
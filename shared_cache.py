@@ -0,0 +1,183 @@
+"""
+Cache cu expirare (TTL) comun pentru toti workerii gunicorn, intr-un fisier mapat in memorie (mmap).
+Tabel de dispersie cu sloturi fixe: cheia (digest de 16 bytes), momentul expirarii si valoarea
+(un numar, sau cativa bytes de lungime maxima fixa, de ex. un raspuns JSON scurt).
+O citire sau o scriere = un lock + cativa slot-uri vecine, fara SQLite si fara parsare de date.
+Intrarile expirate nu se sterg, slotul lor se refoloseste la urmatoarea scriere.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows, acolo avem oricum un singur proces
+    fcntl = None
+
+_MAGIC = b'TTLCACHE'
+# magic, sloturi, value_size (0 = valoare float)
+_HEADER = struct.Struct('<8sII')
+# Cate sloturi vecine se incearca pentru o cheie (linear probing cu fereastra fixa)
+PROBES = 8
+
+
+class SharedTTLCache:
+    # path=None -> harta anonima (MAP_SHARED), vazuta doar de procesele facute prin fork dupa creare
+    # Cu un fisier (langa baza de date) o vad toti workerii, si cu --preload si fara
+    # Intre procese se sincronizeaza cu lockf pe fisier, intre threaduri cu un Lock
+    # warm(): [(cheie, valoare, expira_la)], se incarca o singura data, cand cache-ul e creat gol
+    # value_size=0: valorile sunt float; altfel bytes de cel mult value_size (set() refuza ce e mai lung)
+
+    def __init__(self, path=None, slots=65536, warm=None, value_size=0):
+        self.path = path
+        self.slots = slots
+        self.value_size = value_size
+        # digest cheie, expira_la (epoch), valoare (float, sau lungime + bytes)
+        self._slot = struct.Struct('<16sdd' if not value_size else f'<16sdH{value_size}s')
+        self._empty = self._slot.pack(bytes(16), 0.0, *self._encode(0.0 if not value_size else b''))
+        self._size = _HEADER.size + slots * self._slot.size
+        self._lock = threading.Lock()
+        self._fd = None
+        if path is None:
+            self._map = mmap.mmap(-1, self._size)
+            _HEADER.pack_into(self._map, 0, _MAGIC, slots, value_size)
+            if warm is not None:
+                self._load(warm())
+        else:
+            self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            with self._locked():
+                created = os.fstat(self._fd).st_size != self._size
+                if created:
+                    # Fisier nou sau facut pentru alt format: se reface de la zero
+                    os.ftruncate(self._fd, 0)
+                    os.ftruncate(self._fd, self._size)
+                self._map = mmap.mmap(self._fd, self._size)
+                if _HEADER.unpack_from(self._map, 0) != (_MAGIC, slots, value_size):
+                    self._map[:] = bytes(self._size)
+                    _HEADER.pack_into(self._map, 0, _MAGIC, slots, value_size)
+                    created = True
+                if created and warm is not None:
+                    self._load(warm())
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork_in_child)
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            if self._fd is None or fcntl is None:
+                yield
+                return
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def _after_fork_in_child(self):
+        # Lock-ul putea fi tinut de alt thread in momentul fork-ului; lockf nu se mosteneste
+        self._lock = threading.Lock()
+
+    def _probe(self, digest):
+        start = int.from_bytes(digest[:8], 'little') % self.slots
+        for i in range(PROBES):
+            yield _HEADER.size + ((start + i) % self.slots) * self._slot.size
+
+    def _encode(self, value):
+        return (value,) if not self.value_size else (len(value), value)
+
+    def _decode(self, fields):
+        return fields[0] if not self.value_size else fields[1][:fields[0]]
+
+    def _write(self, offset, digest, expires_at, value):
+        self._slot.pack_into(self._map, offset, digest, expires_at, *self._encode(value))
+
+    @staticmethod
+    def _digest(key):
+        return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+    def _find(self, digest, now):
+        # Offset-ul slotului cu cheia (inca valabila) sau None
+        for offset in self._probe(digest):
+            slot_key, expires_at, *fields = self._slot.unpack_from(self._map, offset)
+            if slot_key == digest and expires_at > now:
+                return offset, self._decode(fields)
+        return None
+
+    def _store(self, digest, value, expires_at, now):
+        # Aceeasi cheie, altfel primul slot expirat/gol, altfel cel care expira primul (evictie)
+        target = None
+        oldest = None
+        for offset in self._probe(digest):
+            slot_key, slot_expires = self._slot.unpack_from(self._map, offset)[:2]
+            if slot_key == digest:
+                target = offset
+                break
+            if slot_expires <= now:
+                if target is None:
+                    target = offset
+            elif oldest is None or slot_expires < oldest[1]:
+                oldest = (offset, slot_expires)
+        if target is None:
+            target = oldest[0]
+        self._write(target, digest, expires_at, value)
+
+    def _load(self, items):
+        now = time.time()
+        for key, value, expires_at in items:
+            if expires_at > now:
+                self._store(self._digest(key), value, expires_at, now)
+
+    def get(self, key, now=None):
+        # Valoarea cheii daca nu a expirat, altfel None
+        digest = self._digest(key)
+        with self._locked():
+            found = self._find(digest, time.time() if now is None else now)
+        return found[1] if found else None
+
+    def set(self, key, value, expires_at, now=None):
+        if self.value_size and len(value) > self.value_size:
+            raise ValueError(f'Valoare prea lunga pentru cache ({len(value)} > {self.value_size} bytes)')
+        digest = self._digest(key)
+        with self._locked():
+            self._store(digest, value, expires_at, time.time() if now is None else now)
+
+    def set_many(self, items, now=None):
+        # items = [(cheie, valoare, expira_la), ...], sub un singur lock
+        now = time.time() if now is None else now
+        entries = [(self._digest(key), value, expires_at) for key, value, expires_at in items]
+        with self._locked():
+            for digest, value, expires_at in entries:
+                self._store(digest, value, expires_at, now)
+
+    def update(self, key, fn, now=None):
+        # Citire-modificare-scriere atomica (intre workeri): fn(valoare sau None, now) -> (valoare, expira_la, rezultat)
+        # Daca fn intoarce valoarea None nu se scrie nimic; se intoarce `rezultat`
+        digest = self._digest(key)
+        now = time.time() if now is None else now
+        with self._locked():
+            found = self._find(digest, now)
+            value, expires_at, result = fn(found[1] if found else None, now)
+            if value is not None:
+                if found:
+                    self._write(found[0], digest, expires_at, value)
+                else:
+                    self._store(digest, value, expires_at, now)
+        return result
+
+    def delete(self, key):
+        digest = self._digest(key)
+        with self._locked():
+            found = self._find(digest, float('-inf'))
+            if found:
+                self._map[found[0]:found[0] + self._slot.size] = self._empty
+
+    def close(self):
+        self._map.close()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
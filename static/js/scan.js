@@ -0,0 +1,157 @@
+(function(){
+    // Valorile din config vin ca atribute data-* pe <body>, pagina ramane la fel pentru toti
+    const QR_TOKEN_BUFFER_SECONDS = Number(document.body.dataset.qrTokenBufferSeconds || 7);
+    const TOKEN_VALIDITY_SECONDS = Number(document.body.dataset.tokenValiditySeconds || 10);
+    const video = document.getElementById('video');
+    const canvas = document.getElementById('canvas');
+    const ctx = canvas.getContext('2d');
+    const startBtn = document.getElementById('startBtn');
+    const stopBtn = document.getElementById('stopBtn');
+    const msg = document.getElementById('msg');
+    const manualToken = document.getElementById('manualToken');
+    const goBtn = document.getElementById('goBtn');
+
+    let stream = null;
+    let rafId = null;
+    let scanning = false;
+    let usingBarcodeDetector = false;
+
+    function showMessage(text, type='error'){
+        msg.textContent = text;
+        msg.className = 'message ' + type;
+        msg.style.display = 'block';
+    }
+
+    function clearMessage(){ msg.style.display = 'none'; }
+
+    function resolveTarget(value){
+        try {
+            const v = (value||'').trim();
+            if(!v) return null;
+            if (/^https?:\/\//i.test(v)) return v; // Intreg url
+            // Daca e doar token, construieste url-ul
+            return '/verify/qr/' + encodeURIComponent(v);
+        } catch(e){ return null; }
+    }
+
+    function redirectTo(target){
+        if(target) window.location.href = target;
+    }
+
+    async function startCamera(){
+        clearMessage();
+        try {
+            stream = await navigator.mediaDevices.getUserMedia({
+                video: { facingMode: { ideal: 'environment' } }, audio: false
+            });
+            video.srcObject = stream;
+            await video.play();
+            stopBtn.disabled = false;
+            startBtn.disabled = true;
+            scanning = true;
+            canvas.width = video.videoWidth || 640;
+            canvas.height = video.videoHeight || 480;
+            runScanner();
+        } catch (e){
+            console.error(e);
+            showMessage('Nu s-a putut porni camera. Verifica permisiunile.', 'error');
+        }
+    }
+
+    function stopCamera(){
+        scanning = false;
+        if (rafId) cancelAnimationFrame(rafId);
+        if (stream){
+            stream.getTracks().forEach(t=>t.stop());
+            stream = null;
+        }
+        startBtn.disabled = false;
+        stopBtn.disabled = true;
+    }
+
+    async function tryBarcodeDetector(){
+        if (!('BarcodeDetector' in window)) return false;
+        try {
+            const formats = await window.BarcodeDetector.getSupportedFormats();
+            if (!formats.includes('qr_code')) return false;
+            const detector = new BarcodeDetector({ formats: ['qr_code'] });
+            usingBarcodeDetector = true;
+
+            const detectFrame = async () => {
+                if (!scanning) return;
+                try {
+                    const barcodes = await detector.detect(video);
+                    if (barcodes && barcodes.length > 0){
+                        const value = barcodes[0].rawValue || '';
+                        const target = resolveTarget(value);
+                        if (target){
+                            stopCamera();
+                            redirectTo(target);
+                            return;
+                        }
+                    }
+                } catch(e) { } // se ig
+                rafId = requestAnimationFrame(detectFrame);
+            };
+            detectFrame();
+            return true;
+        } catch(e){
+            return false;
+        }
+    }
+
+    async function runScanner(){
+        // Prima incercare: foloseste BarcodeDetector API
+        const ok = await tryBarcodeDetector();
+        if (ok) return;
+
+        // A doua incercare: foloseste jsQR
+        usingBarcodeDetector = false;
+        if (!window.jsQR){
+            await new Promise((resolve, reject) => {
+                const s = document.createElement('script');
+                s.src = 'https://cdn.jsdelivr.net/npm/jsqr@1.4.0/dist/jsQR.js';
+                s.onload = resolve; s.onerror = () => reject(new Error('Nu s-a putut incarca jsQR'));
+                document.head.appendChild(s);
+            }).catch(() => showMessage('Nu s-a putut incarca decodorul QR (jsQR).', 'error'));
+            if (!window.jsQR) return;
+        }
+
+        const scan = () => {
+            if (!scanning) return;
+            try {
+                ctx.drawImage(video, 0, 0, canvas.width, canvas.height);
+                const imageData = ctx.getImageData(0, 0, canvas.width, canvas.height);
+                const code = window.jsQR(imageData.data, imageData.width, imageData.height);
+                if (code && code.data){
+                    const target = resolveTarget(code.data);
+                    if (target){
+                        stopCamera();
+                        redirectTo(target);
+                        return;
+                    }
+                }
+            } catch(e) {  }
+            rafId = requestAnimationFrame(scan);
+        };
+        scan();
+    }
+
+    // Butoane
+    startBtn.addEventListener('click', startCamera);
+    stopBtn.addEventListener('click', stopCamera);
+    goBtn.addEventListener('click', () => {
+        const target = resolveTarget(manualToken.value);
+        if (!target) { showMessage('Token invalid.', 'error'); return; }
+        redirectTo(target);
+    });
+
+    // Auto start daca permisiunea e deja pusa
+    if (navigator.mediaDevices && typeof navigator.mediaDevices.getUserMedia === 'function'){
+        navigator.permissions && navigator.permissions.query({name: 'camera'}).then(p => {
+            if (p.state === 'granted') startCamera();
+        }).catch(() => {});
+    } else {
+        showMessage('Camera nu este suportata pe acest dispozitiv.', 'error');
+    }
+})();
@@ -0,0 +1,6 @@
+// Service worker-ul e servit de la /sw.js (nu din /static/) ca sa controleze toate paginile
+if ('serviceWorker' in navigator) {
+    navigator.serviceWorker.register('/sw.js')
+        .then(reg => console.log('Service Worker registered'))
+        .catch(err => console.log('Service Worker registration failed'));
+}
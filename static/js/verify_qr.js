@@ -0,0 +1,211 @@
+// Tokenul se ia din adresa (/verify/qr/<token>): pagina e aceeasi pentru orice token si se poate tine in cache
+const qrToken = decodeURIComponent(location.pathname.split('/').pop());
+
+function getDeviceToken() {
+    return localStorage.getItem('device_token') || '';
+}
+
+// Verifica daca dispozitivul este inregistrat
+window.onload = function() {
+    const deviceToken = getDeviceToken();
+    if (!deviceToken) {
+        document.getElementById('verifyForm').style.display = 'none';
+        document.getElementById('notRegistered').style.display = 'block';
+        return;
+    }
+
+    // Afiseaza numele studentului daca este disponibil
+    const name = localStorage.getItem('student_name');
+    const surname = localStorage.getItem('student_surname');
+    const group = localStorage.getItem('student_group');
+    if (name && surname && group) {
+        document.getElementById('studentName').textContent = `${surname} ${name} (${group})`;
+        document.getElementById('studentInfo').style.display = 'block';
+    }
+};
+
+function getLocation() {
+    return new Promise((resolve, reject) => {
+        if (!navigator.geolocation) {
+            reject(new Error('Geolocation nu este suportat'));
+            return;
+        }
+
+        const statusText = document.getElementById('statusText');
+        let countdown = 15;
+        statusText.textContent = `Asteptare pentru GPS... ${countdown}s`;
+
+        // Afiseaza numaratoarea inversa, ca la NASA
+        const countdownInterval = setInterval(() => {
+            countdown--;
+            if (countdown > 0) {
+                statusText.textContent = `Asteptare pentru GPS... ${countdown}s`;
+            }
+        }, 1000);
+
+        let locationReceived = false;
+
+        navigator.geolocation.getCurrentPosition(
+            (position) => {
+                if (!locationReceived) {
+                    locationReceived = true;
+                    clearInterval(countdownInterval);
+                    statusText.textContent = 'Locatie GPS obtinuta! Verificare...';
+                    resolve({
+                        latitude: position.coords.latitude,
+                        longitude: position.coords.longitude
+                    });
+                }
+            },
+            (error) => {
+                if (!locationReceived) {
+                    locationReceived = true;
+                    clearInterval(countdownInterval);
+                    console.log('Geolocation error:', error);
+                    reject(new Error('Nu s-a putut obtine locatia GPS'));
+                }
+            },
+            { timeout: 15000, enableHighAccuracy: true, maximumAge: 0 }
+        );
+
+        // Timeout manual dupa 16 secunde
+        setTimeout(() => {
+            if (!locationReceived) {
+                locationReceived = true;
+                clearInterval(countdownInterval);
+                reject(new Error('Timeout la obtinerea GPS'));
+            }
+        }, 16000);
+    });
+}
+
+// Cheia de idempotenta a acestei prezente: aceeasi la toate reincercarile, pana vine un raspuns
+function getAttendanceKey() {
+    const storageKey = 'attendance-key:' + qrToken;
+    let key = sessionStorage.getItem(storageKey);
+    if (!key) {
+        key = (window.crypto && crypto.randomUUID)
+            ? crypto.randomUUID()
+            : Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
+        sessionStorage.setItem(storageKey, key);
+    }
+    return key;
+}
+
+function clearAttendanceKey() {
+    sessionStorage.removeItem('attendance-key:' + qrToken);
+}
+
+// Pe retea slaba cererea se reincearca singura cu aceeasi cheie; serverul da raspunsul original
+// daca prima incercare a ajuns, deci nu se poate pune prezenta de doua ori
+// La 429/503 (limita sau server ocupat) se asteapta cat cere Retry-After si se reincearca, tot cu aceeasi cheie;
+// cererea respinsa asa n-a fost procesata, deci cheia ramane si pentru incercarea manuala de dupa
+async function sendAttendance(requestData) {
+    const key = getAttendanceKey();
+    const delays = [1000, 2000, 4000];
+    const maxBusyRetries = 2;
+    let busyRetries = 0;
+    for (let attempt = 0; ; attempt++) {
+        let response;
+        try {
+            response = await fetch('/api/verify-attendance', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Idempotency-Key': key
+                },
+                body: JSON.stringify(requestData)
+            });
+        } catch (error) {
+            if (attempt >= delays.length) {
+                throw error;
+            }
+            await new Promise(resolve => setTimeout(resolve, delays[attempt]));
+            continue;
+        }
+        if ((response.status === 429 || response.status === 503) && busyRetries < maxBusyRetries) {
+            busyRetries++;
+            await waitRetryAfter(response.headers.get('Retry-After'));
+            continue;
+        }
+        const result = await response.json();
+        if (response.status !== 429 && response.status !== 503) {
+            clearAttendanceKey();
+        }
+        return result;
+    }
+}
+
+// Retry-After vine in secunde intregi; fara header (sau cu o valoare ciudata) se asteapta o secunda, maxim 10
+async function waitRetryAfter(header) {
+    const seconds = Math.min(Math.max(parseInt(header, 10) || 1, 1), 10);
+    const statusText = document.getElementById('statusText');
+    for (let left = seconds; left > 0; left--) {
+        statusText.textContent = `Serverul e ocupat, reincerc in ${left}s...`;
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+    statusText.textContent = 'Verificare...';
+}
+
+async function markAttendance() {
+    const submitBtn = document.getElementById('submitBtn');
+    const messageDiv = document.getElementById('message');
+    const statusContainer = document.getElementById('statusContainer');
+    const form = document.getElementById('verifyForm');
+
+    submitBtn.disabled = true;
+    submitBtn.textContent = 'Se verifica...';
+    statusContainer.style.display = 'block';
+
+    const deviceToken = getDeviceToken();
+
+    if (!deviceToken) {
+        messageDiv.innerHTML = '<div class="message error">Nu esti inregistrat pe acest dispozitiv</div>';
+        submitBtn.disabled = false;
+        submitBtn.textContent = 'Apasa sa pui prezenta!!';
+        statusContainer.style.display = 'none';
+        return;
+    }
+
+    // Obtine locatia (OBLIGATORIU)
+    let location;
+    try {
+        location = await getLocation();
+    } catch (error) {
+        messageDiv.innerHTML = '<div class="message error">✗ ' + error.message + '. Activeaza GPS-ul si incearca din nou.</div>';
+        submitBtn.disabled = false;
+        submitBtn.textContent = 'Apasa sa pui prezenta!!';
+        statusContainer.style.display = 'none';
+        return;
+    }
+
+    const requestData = {
+        qr_token: qrToken,
+        device_token: deviceToken,
+        latitude: location.latitude,
+        longitude: location.longitude
+    };
+
+    try {
+        const result = await sendAttendance(requestData);
+
+        statusContainer.style.display = 'none';
+
+        if (result.success) {
+            messageDiv.innerHTML = '<div class="message success">✓ ' + result.message + '</div>';
+            form.style.display = 'none';
+
+            setTimeout(() => {
+                window.location.href = '/';
+            }, 3000);
+        } else {
+            messageDiv.innerHTML = '<div class="message error">✗ ' + result.error + '</div>';
+        }
+    } catch (error) {
+        statusContainer.style.display = 'none';
+        messageDiv.innerHTML = '<div class="message error">✗ Verificarea a esuat. Incearca din nou.</div>';
+    }
+
+    submitBtn.disabled = false;
+    submitBtn.textContent = 'Apasa sa pui prezenta!!';
+}
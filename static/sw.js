@@ -1,91 +1,79 @@
-const CACHE_NAME = 'Sistem-prezena-1';
-const urlsToCache = [
-  '/',
-  '/static/manifest.json',
-  '/register',
-  '/reregister-device',
-  '/student/scan',
-  '/verify'
-];
+// Service worker pentru paginile studentilor (scanare + verificare QR)
+// build_static.py scrie in static/dist/sw.js versiunea si lista de precache (fisierele cu hash);
+// fara build lista e goala si totul merge direct la retea
+const VERSION = 'dev';
+const PRECACHE = [];
 
-//Se instaleaza cacherele initiale
+const CACHE_PREFIX = 'Sistem-prezena-';
+const CACHE_NAME = CACHE_PREFIX + VERSION;
+
+// Paginile "shell": acelasi HTML pentru orice token, se servesc din cache
+// /verify/qr/shell e pagina de verificare fara token, scriptul ia tokenul din adresa
+function shellFor(url) {
+  if (url.pathname === '/scan') {
+    return '/scan';
+  }
+  if (url.pathname.startsWith('/verify/qr/')) {
+    return '/verify/qr/shell';
+  }
+  return null;
+}
+
+// Se instaleaza shell-ul versiunii curente
 self.addEventListener('install', event => {
+  // Inregistrarea veche, de la /static/sw.js, nu mai e folosita
+  if (self.registration.scope.endsWith('/static/')) {
+    self.skipWaiting();
+    return;
+  }
   event.waitUntil(
     caches.open(CACHE_NAME)
-      .then(cache => {
-        console.log('Opened cache');
-        return cache.addAll(urlsToCache);
-      })
-      .catch(err => {
-        console.log('Cache failed:', err);
-      })
+      .then(cache => cache.addAll(PRECACHE))
+      .then(() => self.skipWaiting())
   );
-  self.skipWaiting();
 });
 
-// Se porneste curatarea cach-urilor vechi
+// Se sterg cache-urile versiunilor vechi
 self.addEventListener('activate', event => {
+  if (self.registration.scope.endsWith('/static/')) {
+    event.waitUntil(self.registration.unregister());
+    return;
+  }
   event.waitUntil(
-    caches.keys().then(cacheNames => {
-      return Promise.all(
-        cacheNames.map(cacheName => {
-          if (cacheName !== CACHE_NAME) {
-            console.log('Deleting old cache:', cacheName);
-            return caches.delete(cacheName);
-          }
-        })
-      );
-    })
+    caches.keys()
+      .then(cacheNames => Promise.all(
+        cacheNames
+          .filter(cacheName => cacheName.startsWith(CACHE_PREFIX) && cacheName !== CACHE_NAME)
+          .map(cacheName => caches.delete(cacheName))
+      ))
+      .then(() => self.clients.claim())
   );
-  self.clients.claim();
 });
 
-// Se porneste gestionarea fetch-urilor
+// Doar shell-ul si fisierele cu hash vin din cache; API-urile, admin-ul si restul merg direct la retea
 self.addEventListener('fetch', event => {
-  event.respondWith(
-    caches.match(event.request)
-      .then(response => {
-        // Se gaseste in cache - returneaza raspunsul
-        if (response) {
-          return response;
-        }
-
-        //Clone la rquest
-        const fetchRequest = event.request.clone();
-
-        return fetch(fetchRequest).then(response => {
-          // Se vede daca raspunsul este valid
-          if (!response || response.status !== 200 || response.type !== 'basic') {
-            return response;
-          }
-
-          // Se cach-eaza raspunsul
-          const responseToCache = response.clone();
+  const request = event.request;
+  if (request.method !== 'GET' || PRECACHE.length === 0) {
+    return;
+  }
+  const url = new URL(request.url);
+  if (url.origin !== self.location.origin) {
+    return;
+  }
 
-          caches.open(CACHE_NAME)
-            .then(cache => {
-              cache.put(event.request, responseToCache);
-            });
+  let cacheKey = null;
+  if (request.mode === 'navigate') {
+    cacheKey = shellFor(url);
+  } else if (url.pathname.startsWith('/static/dist/')) {
+    cacheKey = request;
+  }
+  if (cacheKey === null) {
+    return;
+  }
 
-          return response;
-        }).catch(error => {
-          console.log('Fetch failed:', error);
-          // AIci iti spune ca e offline  
-          return new Response('Offline - vezi ca trebuie sa ai internet', {
-            status: 503,
-            statusText: 'Service nu este disponibil, posibil ca esti offline',
-            headers: new Headers({
-              'Content-Type': 'text/plain'
-            })
-          });
-        });
-      })
+  event.respondWith(
+    caches.open(CACHE_NAME)
+      .then(cache => cache.match(cacheKey))
+      .then(response => response || fetch(request))
   );
 });
-
-// Mesaje pentru clienti
-self.addEventListener('message', event => {
-  if (event.data && event.data.type === 'SKIP_WAITING') {
-    self.skipWaiting();
-  }
-});